@@ -1,25 +1,183 @@
+import asyncio
 import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.async_subprocess import run_command
+from utils.records import ActionKind, HealingAction
 
 class ServiceHealer:
+    """Restart stopped services in dependency order, several at a time.
+
+    Each service backs off exponentially between consecutive restarts, and a
+    shared restart budget caps how many restarts may happen per window so a
+    host-wide incident cannot turn into a restart storm.
+    """
+
+    def __init__(self, max_parallel=4, dependencies=None, backoff_base=10, backoff_max=600,
+                 restart_budget=10, budget_window=3600, restart_timeout=10, clock=time.monotonic):
+        self.max_parallel = max(1, max_parallel)
+        # dependencies: {'app': ['db']} restarts db before app when both are down
+        self.dependencies = dependencies or {}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.restart_budget = restart_budget
+        self.budget_window = budget_window
+        self.restart_timeout = restart_timeout
+        self.clock = clock
+        self.attempts = {}
+        self.next_allowed = {}
+        self.recent_restarts = deque()
+        self.last_skipped = {}
+
     @staticmethod
-    def restart_service(service_name):
+    def restart_service(service_name, timeout=10):
         """Attempt to restart a service"""
         try:
-            subprocess.run(['sudo', 'systemctl', 'restart', service_name], 
-                         capture_output=True, timeout=10)
+            result = subprocess.run(['sudo', 'systemctl', 'restart', service_name],
+                                    capture_output=True, text=True, timeout=timeout)
+            if result.returncode != 0:
+                return False, f"Failed to restart {service_name}: {result.stderr.strip() or result.returncode}"
+            return True, f"Restarted {service_name}"
+        except Exception as e:
+            return False, f"Failed to restart {service_name}: {e}"
+
+    @staticmethod
+    async def restart_service_async(service_name, timeout=10):
+        """Attempt to restart a service without blocking the event loop"""
+        try:
+            returncode, _, stderr = await run_command(['sudo', 'systemctl', 'restart', service_name], timeout)
+            if returncode != 0:
+                return False, f"Failed to restart {service_name}: {stderr.strip() or returncode}"
             return True, f"Restarted {service_name}"
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             return False, f"Failed to restart {service_name}: {e}"
-    
+
+    def _levels(self, services):
+        """Group services so each one comes after the services it depends on"""
+        pending = set(services)
+        levels = []
+        while pending:
+            level = [
+                service for service in services
+                if service in pending
+                and not any(dep in pending for dep in self.dependencies.get(service, ()))
+            ]
+            if not level:
+                # Dependency cycle: restart whatever is left together
+                level = [service for service in services if service in pending]
+            levels.append(level)
+            pending.difference_update(level)
+        return levels
+
+    def _admit(self, service, now):
+        """Return (cause, reason) to hold off restarting, or None and reserve budget"""
+        wait = self.next_allowed.get(service, 0) - now
+        if wait > 0:
+            return 'backoff', f"backing off for {wait:.0f}s"
+
+        while self.recent_restarts and now - self.recent_restarts[0] > self.budget_window:
+            self.recent_restarts.popleft()
+        if self.restart_budget and len(self.recent_restarts) >= self.restart_budget:
+            return 'budget', "restart budget exhausted"
+
+        self.recent_restarts.append(now)
+        return None
+
+    def _record(self, service, now):
+        attempts = self.attempts.get(service, 0) + 1
+        self.attempts[service] = attempts
+        self.next_allowed[service] = now + min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+
+    def _plan(self, services_status):
+        """Reset backoff for recovered services and order the stopped ones"""
+        for service, status in services_status.items():
+            if status:
+                self.attempts.pop(service, None)
+                self.next_allowed.pop(service, None)
+                self.last_skipped.pop(service, None)
+        stopped = [service for service, status in services_status.items() if not status]
+        return self._levels(stopped)
+
+    def _runnable(self, level, failed, deferred, actions, now):
+        """Filter a level down to the services that may be restarted now"""
+        runnable = []
+        for service in level:
+            deps = self.dependencies.get(service, ())
+            blocked = [dep for dep in deps if dep in failed]
+            if blocked:
+                failed.add(service)
+                actions.append(HealingAction.build(
+                    ActionKind.SKIP_RESTART, service, False,
+                    f"Skipped restart of {service}: dependency {', '.join(blocked)} failed"
+                ))
+                continue
+
+            waiting = [dep for dep in deps if dep in deferred]
+            if waiting:
+                hold = 'waiting', f"waiting for {', '.join(waiting)}"
+            else:
+                hold = self._admit(service, now)
+            if hold:
+                cause, reason = hold
+                deferred.add(service)
+                # Reported once per cause rather than on every cycle it persists
+                if self.last_skipped.get(service) != cause:
+                    actions.append(HealingAction.build(
+                        ActionKind.SKIP_RESTART, service, False, f"Deferred restart of {service}: {reason}"
+                    ))
+                self.last_skipped[service] = cause
+                continue
+            self.last_skipped.pop(service, None)
+            runnable.append(service)
+        return runnable
+
+    def _action(self, service, success, message, latency, failed):
+        self._record(service, self.clock())
+        if not success:
+            failed.add(service)
+        return HealingAction.build(ActionKind.RESTART_SERVICE, service, success, message,
+                                   round(latency * 1000, 1))
+
+    def _timed_restart(self, service):
+        started = self.clock()
+        success, message = self.restart_service(service, self.restart_timeout)
+        return success, message, self.clock() - started
+
     def heal_services(self, services_status):
         """Heal all stopped services"""
         actions = []
-        for service, status in services_status.items():
-            if not status:
-                success, message = self.restart_service(service)
-                actions.append({
-                    'service': service,
-                    'success': success,
-                    'message': message
-                })
-        return actions
\ No newline at end of file
+        failed = set()
+        deferred = set()
+        levels = self._plan(services_status)
+        if not levels:
+            return actions
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            for level in levels:
+                runnable = self._runnable(level, failed, deferred, actions, self.clock())
+                for service, (success, message, latency) in zip(runnable, executor.map(self._timed_restart, runnable)):
+                    actions.append(self._action(service, success, message, latency, failed))
+        return actions
+
+    async def heal_services_async(self, services_status):
+        """Async variant of heal_services"""
+        actions = []
+        failed = set()
+        deferred = set()
+        limit = asyncio.Semaphore(self.max_parallel)
+
+        async def timed_restart(service):
+            async with limit:
+                started = self.clock()
+                success, message = await self.restart_service_async(service, self.restart_timeout)
+                return success, message, self.clock() - started
+
+        for level in self._plan(services_status):
+            runnable = self._runnable(level, failed, deferred, actions, self.clock())
+            results = await asyncio.gather(*(timed_restart(service) for service in runnable))
+            for service, (success, message, latency) in zip(runnable, results):
+                actions.append(self._action(service, success, message, latency, failed))
+        return actions
@@ -1,26 +1,88 @@
-import subprocess
+import asyncio
+import os
+import time
+from autohealing.temp_cleaner import TempCleaner, format_bytes
+from monitoring.mounts import mount_for
+from utils.records import ActionKind, HealingAction
 
 class SystemHealer:
-    @staticmethod
-    def cleanup_temp():
-        """Clean temp files"""
+    def __init__(self, temp_cleanup=None, mount_thresholds=None, inode_threshold=None):
+        # temp_cleanup: TempCleaner settings (policies, time_budget, ...)
+        self.cleaner = TempCleaner(**(temp_cleanup or {}))
+        self.mount_thresholds = mount_thresholds or {}
+        self.inode_threshold = inode_threshold
+
+    def full_mounts(self, metrics, disk_threshold):
+        """Return the mountpoints above their space or inode threshold"""
+        full = set()
+        for mountpoint, usage in metrics.get('disk_mounts', {}).items():
+            if usage['percent'] > self.mount_thresholds.get(mountpoint, disk_threshold):
+                full.add(mountpoint)
+            elif self.inode_threshold is not None and usage['inodes_percent'] > self.inode_threshold:
+                full.add(mountpoint)
+        return full
+
+    def paths_to_clean(self, metrics, disk_threshold):
+        """Return the cleanup policy paths living on a full mount, or None for all of them"""
+        mounts = metrics.get('disk_mounts')
+        if not mounts:
+            return None if metrics['disk'] > disk_threshold else set()
+        full = self.full_mounts(metrics, disk_threshold)
+        paths = set()
+        for policy in self.cleaner.policies:
+            mountpoint = mount_for(os.path.realpath(policy.path), mounts)
+            # Paths outside every monitored mount follow the root disk figure
+            if mountpoint in full or (mountpoint is None and metrics['disk'] > disk_threshold):
+                paths.add(policy.path)
+        return paths
+
+    def cleanup_temp(self, paths=None):
+        """Clean temp files for one budget slice; None if there is nothing to report"""
+        target = ', '.join(sorted(paths if paths is not None else (p.path for p in self.cleaner.policies)))
+        started = time.monotonic()
         try:
-            subprocess.run(['find', '/tmp', '-type', 'f', '-mtime', '+1', '-delete'], 
-                         capture_output=True)
-            return True, "Cleaned temp files"
+            result = self.cleaner.run(paths)
         except Exception as e:
-            return False, f"Cleanup failed: {e}"
-    
+            return HealingAction.build(ActionKind.CLEANUP_TEMP, target, False, f"Cleanup failed: {e}")
+        if result is None:
+            return None
+
+        files, reclaimed, finished = result
+        if not files and not finished:
+            return None
+        message = f"Cleaned {files} temp files, reclaimed {format_bytes(reclaimed)}"
+        if not finished:
+            message += " (continuing next cycle)"
+        return HealingAction.build(ActionKind.CLEANUP_TEMP, target, True, message,
+                                   round((time.monotonic() - started) * 1000, 1),
+                                   files_removed=files, bytes_reclaimed=reclaimed)
+
+    async def cleanup_temp_async(self, paths=None):
+        """Clean temp files without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.cleanup_temp, paths)
+
+    async def heal_system_async(self, metrics, disk_threshold):
+        """Async variant of heal_system"""
+        actions = []
+
+        paths = self.paths_to_clean(metrics, disk_threshold)
+        if paths is None or paths:
+            action = await self.cleanup_temp_async(paths)
+            if action:
+                actions.append(action)
+
+        return actions
+
     def heal_system(self, metrics, disk_threshold):
         """Heal system based on metrics"""
         actions = []
-        
-        if metrics['disk'] > disk_threshold:
-            success, message = self.cleanup_temp()
-            actions.append({
-                'type': 'cleanup_temp',
-                'success': success,
-                'message': message
-            })
-        
-        return actions
\ No newline at end of file
+
+        # Only clean the temp paths that sit on a mount under pressure
+        paths = self.paths_to_clean(metrics, disk_threshold)
+        if paths is None or paths:
+            action = self.cleanup_temp(paths)
+            if action:
+                actions.append(action)
+
+        return actions
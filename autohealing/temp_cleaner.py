@@ -0,0 +1,178 @@
+import os
+import time
+from threading import Lock
+
+DEFAULT_POLICIES = [{'path': '/tmp', 'min_age': 86400}]
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+class CleanupPolicy:
+    """Which files under one directory tree may be deleted"""
+
+    def __init__(self, path, min_age=86400, min_size=0):
+        self.path = path
+        self.min_age = min_age
+        self.min_size = min_size
+
+class TempCleaner:
+    """Delete stale temp files in-process, a bounded slice per call.
+
+    The walk is iterative over os.scandir and keeps its position between
+    calls, so each cycle spends at most `time_budget` seconds and `max_entries`
+    stat calls before yielding. Once a pass over every policy completes, no new
+    pass starts for `rescan_interval` seconds, and directories whose mtime is
+    unchanged are skipped until their oldest surviving file comes of age.
+    """
+
+    def __init__(self, policies=None, time_budget=0.5, max_entries=5000, rescan_interval=300,
+                 clock=time.monotonic):
+        self.policies = [CleanupPolicy(**policy) for policy in (policies or DEFAULT_POLICIES)]
+        self.time_budget = time_budget
+        self.max_entries = max_entries
+        self.rescan_interval = rescan_interval
+        self.clock = clock
+        self.lock = Lock()
+        # Pending directories as (policy, path, root device), plus the
+        # directory being listed when the last slice ran out of budget
+        self.stack = []
+        self.current = None
+        self.next_pass = 0.0
+        # path -> (mtime_ns, epoch time its next file becomes eligible, subdirs)
+        self.directories = {}
+        self.passes = 0
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+
+    def _start_pass(self, paths=None):
+        self.stack = []
+        for policy in reversed(self.policies):
+            if paths is not None and policy.path not in paths:
+                continue
+            try:
+                device = os.stat(policy.path).st_dev
+            except OSError:
+                continue
+            self.stack.append((policy, policy.path, device))
+
+    def _open(self, policy, path, device, now):
+        """Start listing a directory, or queue its subdirectories if it is unchanged"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self.directories.pop(path, None)
+            return None
+
+        cached = self.directories.get(path)
+        if cached and cached[0] == mtime_ns and now < cached[1]:
+            self.stack.extend((policy, subdir, device) for subdir in cached[2])
+            return None
+
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            return None
+        return {
+            'policy': policy, 'path': path, 'device': device, 'entries': entries,
+            'mtime_ns': mtime_ns, 'next_due': float('inf'), 'subdirs': [], 'removed': False
+        }
+
+    def _visit(self, listing, entry, now):
+        """Handle one directory entry; return bytes reclaimed"""
+        policy = listing['policy']
+        if entry.is_dir(follow_symlinks=False):
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_dev == listing['device']:
+                listing['subdirs'].append(entry.path)
+                self.stack.append((policy, entry.path, listing['device']))
+            return 0
+        if not entry.is_file(follow_symlinks=False):
+            return 0
+
+        stat = entry.stat(follow_symlinks=False)
+        eligible_at = stat.st_mtime + policy.min_age
+        if eligible_at > now:
+            listing['next_due'] = min(listing['next_due'], eligible_at)
+            return 0
+        if stat.st_size < policy.min_size:
+            # Old enough but too small; it may still grow, so recheck next pass
+            listing['next_due'] = now
+            return 0
+
+        os.unlink(entry.path)
+        listing['removed'] = True
+        self.files_removed += 1
+        return stat.st_size
+
+    def _close(self, listing):
+        listing['entries'].close()
+        mtime_ns = listing['mtime_ns']
+        if listing['removed']:
+            # Our own deletions changed the mtime; record the new one
+            try:
+                mtime_ns = os.stat(listing['path']).st_mtime_ns
+            except OSError:
+                return
+        self.directories[listing['path']] = (mtime_ns, listing['next_due'], listing['subdirs'])
+
+    def run(self, paths=None):
+        """Clean for one budget slice; return (files removed, bytes reclaimed, pass finished).
+
+        `paths` limits a new pass to the policies for those paths; a pass
+        already under way runs to completion. Returns None when there is
+        nothing to do: another slice is already running, or the last pass
+        finished less than rescan_interval ago.
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            started = self.clock()
+            if self.current is None and not self.stack:
+                if started < self.next_pass:
+                    return None
+                self._start_pass(paths)
+
+            now = time.time()
+            deadline = started + self.time_budget
+            removed_before = self.files_removed
+            reclaimed = 0
+            visited = 0
+            while visited < self.max_entries and self.clock() < deadline:
+                if self.current is None:
+                    if not self.stack:
+                        break
+                    self.current = self._open(*self.stack.pop(), now)
+                    visited += 1
+                    continue
+
+                entry = next(self.current['entries'], None)
+                if entry is None:
+                    self._close(self.current)
+                    self.current = None
+                    continue
+                visited += 1
+                try:
+                    reclaimed += self._visit(self.current, entry, now)
+                except OSError:
+                    # Vanished, busy or not ours to delete
+                    pass
+
+            finished = self.current is None and not self.stack
+            if finished:
+                self.passes += 1
+                self.next_pass = self.clock() + self.rescan_interval
+            self.bytes_reclaimed += reclaimed
+            return self.files_removed - removed_before, reclaimed, finished
+        finally:
+            self.lock.release()
+
+    def stats(self):
+        return {
+            'passes': self.passes,
+            'files_removed': self.files_removed,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'pending_directories': len(self.stack) + (self.current is not None)
+        }
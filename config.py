@@ -1,10 +1,95 @@
 CONFIG = {
     'interval': 10,  # seconds between checks
+    'collector_intervals': {  # slower collectors on their own cadence; omitted ones run every interval
+        'disk': 60,              # intervals shorter than `interval` run every cycle instead, since
+        'processes': 30          # only the reading at the cycle is logged, stored and evaluated
+    },
+    'scheduler_policy': 'coalesce',  # missed ticks: 'coalesce', 'skip' or 'catch_up'
+    'engine': 'sync',  # 'async' runs collectors and healers concurrently on asyncio
+    'task_timeout': 8,  # seconds before an async collector is cancelled
+    'cycle_timeout': 30,  # seconds before an async cycle is cancelled; healing gets what collection leaves
+    'cpu_sampler': 'delta',  # 'delta' (non-blocking cpu_times deltas) or 'blocking' (1s sample)
     'cpu_threshold': 80,
     'memory_threshold': 85,
     'disk_threshold': 90,
+    'disk_mounts': None,  # mountpoints to watch, e.g. ['/', '/var/lib', '/data']; None for every real filesystem
+    'disk_mount_thresholds': {},  # per-mount overrides of disk_threshold, e.g. {'/data': 95}
+    'inode_threshold': 90,  # inode usage % on any mount; None disables
+    'io_thresholds': {  # rate alerts; omit a key to disable it
+        'disk_latency_ms': 100,  # average time per request
+        'disk_busy_percent': 95,
+        'network_errors_per_s': 1
+    },
+    'alert_rules': {  # per alert kind: 'for' seconds in breach before firing,
+                      # 'hysteresis' points below the threshold before it resolves
+        'high_cpu': {'for': 60, 'hysteresis': 5},
+        'high_memory': {'for': 60, 'hysteresis': 5},
+        'low_disk': {'for': 0, 'hysteresis': 2},
+        'low_inodes': {'for': 0, 'hysteresis': 2},
+        'io_latency': {'for': 30, 'hysteresis': 20},
+        'io_utilization': {'for': 30, 'hysteresis': 10},
+        'network_errors': {'for': 30},
+        'service_down': {'for': 0}
+    },
+    'alert_flap_window': 600,  # seconds; an alert changing state alert_flap_threshold times
+    'alert_flap_threshold': 4,  # within the window is reported once as flapping
+    'metric_rules': [  # extra rules on any flattened metric name; '*' matches one part (disk, NIC, mount)
+        # {'metric': 'cpu', 'kind': 'high_cpu', 'threshold': 70, 'reduce': 'avg', 'window': 300, 'resource': 'cpu-5m'},
+        # {'metric': 'network.*.rx_bytes_per_s', 'threshold': 100e6, 'reduce': 'p95', 'window': 600},
+        # {'metric': 'disk_mounts.*.percent', 'kind': 'low_disk', 'threshold': 0.05, 'reduce': 'rate', 'window': 900}
+    ],  # reduce: 'last', 'avg', 'min', 'max', 'rate' (per second) or 'pNN' over window seconds; op: '>', '>=', '<', '<='
+    'rule_history': 360,  # evaluations kept for windowed rules; must cover the longest window / interval
+    'process_top_n': 5,  # processes listed per top-CPU/RSS/IO ranking
     'services': ['cron', 'dbus'],
+    'service_check_mode': 'batch',  # 'batch' (one systemctl call), 'parallel', 'sequential' or
+                                    # 'events' (systemd D-Bus signals, needs jeepney; polls while disconnected);
+                                    # in 'events' mode a unit starting or stopping runs the cycle at once
+    'event_cycle_min_gap': 5,  # seconds; event-triggered cycles start at least this long after the last one
+    'service_check_timeout': 5,
+    'service_check_workers': 8,  # parallel fallback pool size
     'auto_heal': True,
+    'healing': {  # service restart policy
+        'max_parallel': 4,  # restarts in flight at once
+        'dependencies': {},  # e.g. {'app': ['postgresql']} restarts postgresql first
+        'backoff_base': 10,  # seconds; doubles on each consecutive restart of a unit
+        'backoff_max': 600,
+        'restart_budget': 10,  # restarts allowed per budget_window across all units; 0 disables
+        'budget_window': 3600,
+        'restart_timeout': 10
+    },
+    'temp_cleanup': {  # in-process temp cleaner run while disk is above threshold
+        'policies': [  # each: path, min_age (seconds since mtime), min_size (bytes)
+            {'path': '/tmp', 'min_age': 86400},
+            {'path': '/var/tmp', 'min_age': 7 * 86400}
+        ],
+        'time_budget': 0.5,  # seconds of walking per cycle; the walk resumes next cycle
+        'max_entries': 5000,  # directory entries examined per cycle
+        'rescan_interval': 300  # seconds before a finished pass starts over
+    },
     'log_file': './logs/monitor.log',
-    'dashboard_port': 8090
+    'log_buffered': True,  # queue events and write them in batches from a background thread
+    'log_batch_size': 100,
+    'log_flush_interval': 1.0,  # seconds
+    'log_durability': 'flush',  # 'flush', 'interval' (fsync every log_fsync_interval_ms) or 'batch'
+    'log_fsync_interval_ms': 1000,
+    'log_rotation': {  # set to None to append to a single file forever
+        'max_bytes': 50 * 1024 * 1024,
+        'interval': 86400,  # seconds, aligned to local wall-clock boundaries
+        'compression': 'gzip',  # 'gzip', 'zstd' (needs zstandard) or None
+        'keep_uncompressed': 2,  # newest segments left plain so queries can seek in them
+        'max_segments': 30,
+        'max_age': 30 * 86400  # seconds
+    },
+    'metric_store_dir': './logs/metrics',  # binary time-series store; None to keep metrics in the JSON log
+    'rollup_tiers': [('1m', 60), ('5m', 300), ('1h', 3600)],  # min/max/avg/p95 buckets
+    'incident_snapshot': './logs/incidents.json',  # running incident/MTTR counters; None keeps them in memory only
+    'incident_snapshot_interval': 60,  # seconds between snapshot writes
+    'trend_window': 86400,  # seconds of history shown in the trend chart
+    'render_async': True,  # 'reload' mode: render the dashboard on a background thread, coalescing cycles
+    'dashboard_port': 8090,
+    'dashboard_max_connections': 256,
+    'dashboard_keepalive_timeout': 15,  # seconds an idle keep-alive connection is held
+    'dashboard_refresh': 'incremental',  # 'incremental' (poll /api/metrics deltas; page rendered on request) or 'reload'
+    'dashboard_poll_interval': 5,  # seconds between incremental updates
+    'dashboard_full_refresh': 600  # seconds between full page reloads in incremental mode
 }
\ No newline at end of file
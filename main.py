@@ -1,39 +1,149 @@
+import asyncio
 import time
+from datetime import datetime
 from config import CONFIG
 from monitoring.system_monitor import SystemMonitor
 from monitoring.service_monitor import ServiceMonitor
 from monitoring.alert_manager import AlertManager
 from autohealing.service_healer import ServiceHealer
 from autohealing.system_healer import SystemHealer
+from utils.incident_stats import IncidentAggregator
 from utils.logger import Logger
+from utils.metric_store import MetricStore
+from utils.scheduler import AsyncScheduler, Scheduler
 from visualization.dashboard import Dashboard
 import webbrowser
 
+SYSTEM_COLLECTORS = ('cpu', 'memory', 'disk', 'io', 'network', 'processes')
+# Readings every cycle needs for display, alerts and healing
+REQUIRED_METRICS = ('cpu', 'memory', 'disk')
+
 class SystemMonitorApp:
     def __init__(self, config):
         self.config = config
-        self.monitor = SystemMonitor()
-        self.service_monitor = ServiceMonitor(config['services'])
+        if config.get('engine') == 'async':
+            self.scheduler = AsyncScheduler(config.get('scheduler_policy', 'coalesce'),
+                                            timeout=config.get('task_timeout'))
+        else:
+            self.scheduler = Scheduler(config.get('scheduler_policy', 'coalesce'))
+        self.monitor = SystemMonitor(config.get('cpu_sampler', 'delta'), config.get('disk_mounts'),
+                                     config.get('process_top_n', 5))
+        self.service_monitor = ServiceMonitor(
+            config['services'],
+            mode=config.get('service_check_mode', 'batch'),
+            timeout=config.get('service_check_timeout', 5),
+            max_workers=config.get('service_check_workers', 8),
+            on_change=self._service_changed
+        )
         self.alert_manager = AlertManager({
             'cpu': config['cpu_threshold'],
             'memory': config['memory_threshold'],
-            'disk': config['disk_threshold']
-        })
-        self.service_healer = ServiceHealer()
-        self.system_healer = SystemHealer()
-        self.logger = Logger(config['log_file'])
-        self.dashboard = Dashboard(config['dashboard_port'])
+            'disk': config['disk_threshold'],
+            'disk_mounts': config.get('disk_mount_thresholds', {}),
+            'inodes': config.get('inode_threshold'),
+            'io': config.get('io_thresholds', {})
+        }, config.get('alert_rules'), config.get('alert_flap_window', 600), config.get('alert_flap_threshold', 4),
+            config.get('metric_rules'), config.get('rule_history', 360))
+        self.service_healer = ServiceHealer(**config.get('healing', {}))
+        self.system_healer = SystemHealer(
+            config.get('temp_cleanup'),
+            mount_thresholds=config.get('disk_mount_thresholds'),
+            inode_threshold=config.get('inode_threshold')
+        )
+        self.logger = Logger(
+            config['log_file'],
+            buffered=config.get('log_buffered', False),
+            batch_size=config.get('log_batch_size', 100),
+            flush_interval=config.get('log_flush_interval', 1.0),
+            durability=config.get('log_durability', 'flush'),
+            fsync_interval_ms=config.get('log_fsync_interval_ms', 1000),
+            rotation=config.get('log_rotation')
+        )
+        self.metric_store = None
+        if config.get('metric_store_dir'):
+            self.metric_store = MetricStore(config['metric_store_dir'], config.get('rollup_tiers'))
+        self.incidents = IncidentAggregator(config.get('incident_snapshot'),
+                                            config.get('incident_snapshot_interval', 60))
+        self.dashboard = Dashboard(
+            config['dashboard_port'],
+            config['log_file'],
+            self.metric_store,
+            trend_window=config.get('trend_window', 86400),
+            max_connections=config.get('dashboard_max_connections', 256),
+            keepalive_timeout=config.get('dashboard_keepalive_timeout', 15),
+            refresh_mode=config.get('dashboard_refresh', 'reload'),
+            poll_interval=config.get('dashboard_poll_interval', 5),
+            full_refresh_interval=config.get('dashboard_full_refresh', 600),
+            incidents=self.incidents,
+            thresholds={name: config[f'{name}_threshold'] for name in ('cpu', 'memory', 'disk')}
+        )
         self.cycle_count = 0
+        # Collectors listed here run on their own interval; the rest run every cycle
+        self.collector_intervals = {}
+        for name, interval in (config.get('collector_intervals') or {}).items():
+            if interval < config['interval']:
+                # Faster ticks would only overwrite each other between cycles
+                print(f"Collector '{name}' interval {interval}s is below the cycle interval; "
+                      f"running it every cycle")
+            else:
+                self.collector_intervals[name] = interval
+        # Collection is bounded by task_timeout; healing gets the rest of the cycle
+        self.healing_timeout = None
+        if config.get('cycle_timeout') is not None:
+            self.healing_timeout = config['cycle_timeout'] - (config.get('task_timeout') or 0)
+            restart_timeout = self.service_healer.restart_timeout
+            if self.healing_timeout < restart_timeout:
+                print(f"cycle_timeout leaves {self.healing_timeout:g}s for healing, less than "
+                      f"healing.restart_timeout ({restart_timeout:g}s); restarts may be cancelled")
+        self.dashboard.status_sources.update({
+            'scheduler': self.scheduler.stats,
+            'rule_engine': self.alert_manager.engine.stats,
+            'temp_cleaner': self.system_healer.cleaner.stats
+        })
+        if self.service_monitor.watcher is not None:
+            self.dashboard.status_sources['unit_events'] = self.service_monitor.watcher.stats
+        self.latest_metrics = {}
+        self.latest_services = {}
+        self.logged_processes = None
     
-    def run_monitoring_cycle(self):
-        """Run one monitoring cycle"""
-        self.cycle_count += 1
-        print(f"\n=== Cycle #{self.cycle_count} ===")
-        
-        # 1. Collect metrics
-        metrics = self.monitor.check_system()
-        services_status = self.service_monitor.check_all_services()
-        
+    def collect(self, name):
+        """Run one collector and keep its latest result"""
+        if name == 'services':
+            self.latest_services = self.service_monitor.check_all_services()
+        else:
+            self.latest_metrics.update(getattr(self.monitor, f'check_{name}')())
+    
+    async def collect_async(self, name):
+        """Run one collector on the event loop, with a timeout"""
+        try:
+            if name == 'services':
+                self.latest_services = await asyncio.wait_for(
+                    self.service_monitor.check_all_services_async(), self.config.get('task_timeout'))
+            else:
+                loop = asyncio.get_running_loop()
+                check = getattr(self.monitor, f'check_{name}')
+                self.latest_metrics.update(await asyncio.wait_for(
+                    loop.run_in_executor(None, check), self.config.get('task_timeout')))
+        except asyncio.TimeoutError:
+            print(f"Collector '{name}' timed out; keeping its last reading")
+    
+    def _service_changed(self, service, running):
+        """Run the cycle now so a unit event is evaluated and healed without waiting for the next tick"""
+        print(f"Service {service} {'started' if running else 'stopped'}; scheduling a cycle")
+        # A crash-looping unit changes state many times a second; those merge into one cycle
+        self.scheduler.trigger('cycle', self.config.get('event_cycle_min_gap', 5))
+
+    def _unscheduled_collectors(self):
+        return [name for name in SYSTEM_COLLECTORS + ('services',) if name not in self.collector_intervals]
+    
+    def _snapshot(self):
+        """Return copies of the latest metrics and services status"""
+        metrics = dict(self.latest_metrics)
+        metrics['timestamp'] = datetime.now().strftime("%H:%M:%S")
+        return metrics, dict(self.latest_services)
+    
+    def _check_alerts(self, collected_at, metrics, values, services_status):
+        """Display collected state; return the cycle's alert transitions and firing alerts"""
         print(f"Metrics :\n   CPU: {metrics['cpu']:.1f}%, Mem: {metrics['memory']:.1f}%, Disk: {metrics['disk']:.1f}%")
         
         # 2. Display services status
@@ -42,13 +152,86 @@ class SystemMonitorApp:
             print(f"   {service}: {'Running' if status else 'Stopped'}")
         
         # 3. Check for alerts
-        alerts = self.alert_manager.check_all_alerts(metrics, services_status)
-        if alerts:
+        alerts, active_alerts = self.alert_manager.evaluate(values, services_status, collected_at)
+        if active_alerts:
             print("Alerts :")
-            for alert in alerts:
+            for alert in active_alerts:
                 print(f"   {alert}")
         else:
             print("No alerts")
+        # Only changes are logged; a standing alert is not repeated every cycle
+        if alerts:
+            print("Alert changes :")
+            for alert in alerts:
+                print(f"   {alert.state.value}: {alert.message}")
+        return alerts, active_alerts
+    
+    def _finish_cycle(self, collected_at, metrics, values, services_status, alerts, active_alerts,
+                      healing_actions):
+        """Display healing actions, log the cycle and update the dashboard"""
+        if healing_actions:
+            print("Auto-healing actions :")
+            for action in healing_actions:
+                if isinstance(action, dict):
+                    print(f"   {action['message']}")
+                else:
+                    print(f"   {action}")
+        
+        # 5. Log everything
+        if self.metric_store is not None:
+            self.metric_store.append(collected_at, values)
+            # Top-process lists are not series; log each new snapshot once
+            processes = metrics.get('processes')
+            if processes and processes is not self.logged_processes:
+                self.logger.log_event('processes', processes)
+                self.logged_processes = processes
+        else:
+            self.logger.log_event('metrics', metrics)
+        self.logger.log_event('services', services_status)
+        if alerts:
+            self.logger.log_event('alerts', alerts)
+        if healing_actions:
+            self.logger.log_event('healing', healing_actions)
+        
+        self.incidents.record(collected_at, services_status, alerts, healing_actions)
+        
+        # 6. Update dashboard
+        self.dashboard.record_cycle(collected_at, metrics, alerts, healing_actions, active_alerts)
+        if self.dashboard.refresh_mode == 'incremental':
+            # Open pages update themselves from the API; the page is only
+            # rendered when someone loads it
+            self.dashboard.render_on_request(metrics, active_alerts, healing_actions)
+        elif self.config.get('render_async', False):
+            self.dashboard.submit_dashboard(metrics, active_alerts, healing_actions)
+            lag = self.dashboard.renderer.lag()
+            if lag > self.config['interval']:
+                print(f"Dashboard renderer lagging: {lag:.1f}s")
+        else:
+            self.dashboard.generate_dashboard(metrics, active_alerts, healing_actions)
+        
+        print("-" * 40)
+        
+        return metrics, alerts, healing_actions
+    
+    def run_monitoring_cycle(self):
+        """Run one monitoring cycle"""
+        self.cycle_count += 1
+        print(f"\n=== Cycle #{self.cycle_count} ===")
+        
+        # 1. Collect metrics
+        collected_at = time.time()
+        for name in self._unscheduled_collectors():
+            self.collect(name)
+        metrics, services_status = self._snapshot()
+        missing = [name for name in REQUIRED_METRICS if name not in metrics]
+        if missing:
+            # A separately scheduled collector has not reported (or timed out) yet
+            print(f"No {', '.join(missing)} reading yet; skipping this cycle")
+            return None
+        # Flattened once for both the rule engine and the metric store
+        values = dict(MetricStore.flatten(metrics))
+        
+        alerts, active_alerts = self._check_alerts(collected_at, metrics, values, services_status)
         
         # 4. Auto-healing
         healing_actions = []
@@ -60,30 +243,61 @@ class SystemMonitorApp:
             # Heal system
             system_actions = self.system_healer.heal_system(metrics, self.config['disk_threshold'])
             healing_actions.extend(system_actions)
-            
-            # Display healing actions
-            if healing_actions:
-                print("Auto-healing actions :")
-                for action in healing_actions:
-                    if isinstance(action, dict):
-                        print(f"   {action['message']}")
-                    else:
-                        print(f"   {action}")
         
-        # 5. Log everything
-        self.logger.log_event('metrics', metrics)
-        self.logger.log_event('services', services_status)
-        if alerts:
-            self.logger.log_event('alerts', alerts)
-        if healing_actions:
-            self.logger.log_event('healing', healing_actions)
+        return self._finish_cycle(collected_at, metrics, values, services_status, alerts, active_alerts,
+                                  healing_actions)
+    
+    async def run_monitoring_cycle_async(self):
+        """Run one monitoring cycle with collectors and healers running concurrently"""
+        self.cycle_count += 1
+        print(f"\n=== Cycle #{self.cycle_count} ===")
         
-        # 6. Update dashboard
-        self.dashboard.generate_dashboard(metrics, alerts, healing_actions)
+        # 1. Collect metrics
+        collected_at = time.time()
+        await asyncio.gather(*(self.collect_async(name) for name in self._unscheduled_collectors()))
+        metrics, services_status = self._snapshot()
+        missing = [name for name in REQUIRED_METRICS if name not in metrics]
+        if missing:
+            # A separately scheduled collector has not reported (or timed out) yet
+            print(f"No {', '.join(missing)} reading yet; skipping this cycle")
+            return None
+        # Flattened once for both the rule engine and the metric store
+        values = dict(MetricStore.flatten(metrics))
         
-        print("-" * 40)
+        alerts, active_alerts = self._check_alerts(collected_at, metrics, values, services_status)
         
-        return metrics, alerts, healing_actions
+        # 4. Auto-healing
+        healing_actions = []
+        try:
+            if self.config['auto_heal']:
+                timeout = self.healing_timeout
+                results = await asyncio.gather(
+                    asyncio.wait_for(self.service_healer.heal_services_async(services_status), timeout),
+                    asyncio.wait_for(self.system_healer.heal_system_async(metrics, self.config['disk_threshold']), timeout),
+                    return_exceptions=True
+                )
+                for healer, result in zip(('service', 'system'), results):
+                    if isinstance(result, asyncio.TimeoutError):
+                        print(f"{healer.capitalize()} healing timed out and was cancelled")
+                    elif isinstance(result, BaseException):
+                        raise result
+                    else:
+                        healing_actions.extend(result)
+        finally:
+            # The tracker has already moved on to these transitions, so they
+            # are logged even if the scheduler cancels the cycle mid-healing
+            cycle = self._finish_cycle(collected_at, metrics, values, services_status, alerts, active_alerts,
+                                       healing_actions)
+        return cycle
+    
+    async def _run_async(self):
+        """Prime the separately scheduled collectors, then run every task on the event loop"""
+        # Async tasks all start at once, so the first cycle would not wait for these
+        await asyncio.gather(*(self.collect_async(name) for name in self.collector_intervals))
+        for task in self.scheduler.tasks:
+            if task.name in self.collector_intervals:
+                task.deadline += task.interval
+        await self.scheduler.run_forever()
     
     def run_continuous(self):
         """Run monitoring continuously"""
@@ -102,14 +316,34 @@ class SystemMonitorApp:
         except:
             pass
         
+        # Separately scheduled collectors are registered first so the sync
+        # scheduler runs them before the first cycle; the async one primes them
+        if isinstance(self.scheduler, AsyncScheduler):
+            for name, interval in self.collector_intervals.items():
+                self.scheduler.add(name, interval, lambda name=name: self.collect_async(name))
+            self.scheduler.add('cycle', self.config['interval'], self.run_monitoring_cycle_async,
+                               timeout=self.config.get('cycle_timeout'))
+        else:
+            for name, interval in self.collector_intervals.items():
+                self.scheduler.add(name, interval, lambda name=name: self.collect(name))
+            self.scheduler.add('cycle', self.config['interval'], self.run_monitoring_cycle)
+        
         try:
-            while True:
-                self.run_monitoring_cycle()
-                time.sleep(self.config['interval'])
+            if isinstance(self.scheduler, AsyncScheduler):
+                asyncio.run(self._run_async())
+            else:
+                self.scheduler.run_forever()
         except KeyboardInterrupt:
             print("\nMonitor stopped by user")
         except Exception as e:
             print(f"\nError: {e}")
+        finally:
+            self.dashboard.stop()
+            self.service_monitor.close()
+            self.incidents.close()
+            self.logger.close()
+            if self.metric_store is not None:
+                self.metric_store.close()
 
 def main():
     """Main function"""
@@ -1,32 +1,70 @@
+import time
+from monitoring.alert_state import AlertTracker
+from monitoring.rule_engine import RuleEngine
+from utils.records import Alert, AlertKind
+
+def threshold_rules(thresholds):
+    """Rules equivalent to the configured resource, mount and rate thresholds"""
+    mount_overrides = thresholds.get('disk_mounts', {})
+    rules = [
+        {'metric': 'cpu', 'kind': 'high_cpu', 'threshold': thresholds['cpu'], 'ceiling': 100},
+        {'metric': 'memory', 'kind': 'high_memory', 'threshold': thresholds['memory'], 'ceiling': 100},
+        # The per-mount rule below reports '/' too when mounts are collected;
+        # its reading replaces this one
+        {'metric': 'disk', 'kind': 'low_disk', 'threshold': thresholds['disk'], 'ceiling': 100,
+         'resource': '/', 'overrides': mount_overrides},
+        {'metric': 'disk_mounts.*.percent', 'kind': 'low_disk', 'threshold': thresholds['disk'], 'ceiling': 100,
+         'overrides': mount_overrides}
+    ]
+    if thresholds.get('inodes') is not None:
+        rules.append({'metric': 'disk_mounts.*.inodes_percent', 'kind': 'low_inodes',
+                      'threshold': thresholds['inodes'], 'ceiling': 100})
+
+    limits = thresholds.get('io', {})
+    if limits.get('disk_latency_ms') is not None:
+        rules.append({'metric': 'disk_io.*.latency_ms', 'kind': 'io_latency',
+                      'threshold': limits['disk_latency_ms']})
+    if limits.get('disk_busy_percent') is not None:
+        rules.append({'metric': 'disk_io.*.busy_percent', 'kind': 'io_utilization',
+                      'threshold': limits['disk_busy_percent'], 'ceiling': 100})
+    if limits.get('network_errors_per_s') is not None:
+        rules.append({'metric': 'network.*.errors_per_s', 'kind': 'network_errors',
+                      'threshold': limits['network_errors_per_s']})
+    return rules
+
 class AlertManager:
-    def __init__(self, thresholds):
+    def __init__(self, thresholds, rules=None, flap_window=600, flap_threshold=4, metric_rules=None,
+                 history=360):
         self.thresholds = thresholds
-    
-    def check_thresholds(self, metrics):
-        """Check for system alerts"""
-        alerts = []
-        
-        if metrics['cpu'] > self.thresholds['cpu']:
-            alerts.append(f"High CPU: {metrics['cpu']}%")
-        
-        if metrics['memory'] > self.thresholds['memory']:
-            alerts.append(f"High Memory: {metrics['memory']}%")
-        
-        if metrics['disk'] > self.thresholds['disk']:
-            alerts.append(f"Low Disk: {metrics['disk']}%")
-        
-        return alerts
-    
-    def check_services_alerts(self, services_status):
+        self.tracker = AlertTracker(rules, flap_window, flap_threshold)
+        self.engine = RuleEngine(threshold_rules(thresholds) + list(metric_rules or []), history,
+                                 self.tracker.hysteresis())
+
+    def check_thresholds(self, values, ts=None):
+        """Check for system alerts in the flattened metrics"""
+        alerts = self.engine.evaluate(values, ts, self.tracker.is_active)
+        # One alert per (kind, resource), keeping the last rule's reading
+        return list({alert.key: alert for alert in alerts}.values())
+
+    def check_services_alerts(self, services_status, ts=None):
         """Check for service alerts"""
+        ts = time.time() if ts is None else ts
         alerts = []
         for service, status in services_status.items():
             if not status:
-                alerts.append(f"Service down: {service}")
+                alerts.append(Alert.build(AlertKind.SERVICE_DOWN, service, ts=ts))
         return alerts
-    
-    def check_all_alerts(self, metrics, services_status):
+
+    def check_all_alerts(self, values, services_status, ts=None):
         """Check all alerts"""
-        system_alerts = self.check_thresholds(metrics)
-        service_alerts = self.check_services_alerts(services_status)
-        return system_alerts + service_alerts
\ No newline at end of file
+        ts = time.time() if ts is None else ts
+        system_alerts = self.check_thresholds(values, ts)
+        service_alerts = self.check_services_alerts(services_status, ts)
+        return system_alerts + service_alerts
+
+    def evaluate(self, values, services_status, ts=None):
+        """Check all alerts on flattened metrics; return (state transitions, currently firing alerts)"""
+        ts = time.time() if ts is None else ts
+        transitions = self.tracker.update(self.check_all_alerts(values, services_status, ts), ts,
+                                          self.engine.value)
+        return transitions, self.tracker.active()
@@ -0,0 +1,112 @@
+from collections import deque
+from dataclasses import replace
+from utils.records import AlertKind, AlertState
+
+class AlertTracker:
+    """Turn each cycle's breaching alerts into pending/firing/resolved transitions.
+
+    A breach is pending until it has held for the rule's `for` seconds, then
+    fires; it resolves once a cycle no longer reports it. While an alert is
+    pending or firing, its threshold is relaxed by the rule's `hysteresis`
+    band so values hovering around the threshold do not toggle it. An alert
+    that changes state `flap_threshold` times within `flap_window` seconds is
+    reported once as flapping and stays quiet until it has been stable for a
+    full window.
+    Only transitions are returned, so an unchanged alert is reported once.
+    """
+
+    def __init__(self, rules=None, flap_window=600, flap_threshold=4):
+        self.rules = {AlertKind(kind): rule for kind, rule in (rules or {}).items()}
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        # (kind, resource) -> {'state', 'since', 'alert', 'changes', 'flapping'}
+        self.alerts = {}
+
+    def _rule(self, kind, name, default=0):
+        return self.rules.get(kind, {}).get(name, default)
+
+    def is_active(self, kind, resource):
+        """Whether the alert is pending or firing"""
+        entry = self.alerts.get((kind, resource))
+        return entry is not None and entry['state'] != AlertState.RESOLVED
+
+    def hysteresis(self):
+        """Return {AlertKind: hysteresis band} for every rule that has one"""
+        return {kind: rule['hysteresis'] for kind, rule in self.rules.items() if rule.get('hysteresis')}
+
+    def _transition(self, entry, state, ts, transitions):
+        entry['state'] = state
+        entry['changes'].append(ts)
+        if entry['flapping']:
+            return
+        if len(entry['changes']) >= self.flap_threshold:
+            entry['flapping'] = True
+            state = AlertState.FLAPPING
+        transitions.append(replace(entry['alert'], state=state, ts=ts))
+
+    @staticmethod
+    def _clear(entry, current):
+        """Refresh an alert that stopped breaching with its current reading"""
+        alert = entry['alert']
+        value = current(alert.kind, alert.resource) if current is not None else None
+        if value is not None:
+            entry['alert'] = replace(alert, value=value)
+
+    def update(self, alerts, ts, current=None):
+        """Feed the alerts breaching at `ts`; return the state transitions they cause.
+
+        `current(kind, resource)` gives the reading of an alert that is no
+        longer breaching, so its resolve reports the value it cleared at.
+        """
+        transitions = []
+        breaching = {}
+        for alert in alerts:
+            breaching[alert.key] = alert
+
+        for key, alert in breaching.items():
+            entry = self.alerts.get(key)
+            if entry is None:
+                entry = {'state': AlertState.RESOLVED, 'since': ts, 'alert': alert,
+                         'changes': deque(), 'flapping': False}
+                self.alerts[key] = entry
+            entry['alert'] = alert
+            if entry['state'] == AlertState.RESOLVED:
+                entry['state'] = AlertState.PENDING
+                entry['since'] = ts
+            if entry['state'] == AlertState.PENDING and ts - entry['since'] >= self._rule(alert.kind, 'for'):
+                self._transition(entry, AlertState.FIRING, ts, transitions)
+
+        for key, entry in list(self.alerts.items()):
+            if key not in breaching:
+                if entry['state'] == AlertState.FIRING:
+                    self._clear(entry, current)
+                    self._transition(entry, AlertState.RESOLVED, ts, transitions)
+                elif entry['state'] == AlertState.PENDING:
+                    # Cleared before it fired: nothing was ever reported
+                    entry['state'] = AlertState.RESOLVED
+
+            changes = entry['changes']
+            while changes and changes[0] <= ts - self.flap_window:
+                changes.popleft()
+            if entry['flapping'] and not changes:
+                # Stable for a whole window: report where it settled; anything
+                # but firing is a resolve, so the flapping notice is closed
+                entry['flapping'] = False
+                if entry['state'] == AlertState.FIRING:
+                    transitions.append(replace(entry['alert'], state=AlertState.FIRING, ts=ts))
+                else:
+                    if key not in breaching:
+                        self._clear(entry, current)
+                    transitions.append(replace(entry['alert'], state=AlertState.RESOLVED, ts=ts))
+            if entry['state'] == AlertState.RESOLVED and not changes and not entry['flapping']:
+                del self.alerts[key]
+
+        return transitions
+
+    def active(self):
+        """Latest reading of every firing alert, marked flapping where it is"""
+        return [
+            replace(entry['alert'], state=AlertState.FLAPPING) if entry['flapping'] else entry['alert']
+            for entry in self.alerts.values()
+            if entry['state'] == AlertState.FIRING
+        ]
@@ -0,0 +1,161 @@
+import os
+import re
+import select
+import time
+
+MOUNTINFO = '/proc/self/mountinfo'
+
+# Virtual filesystems with no capacity worth watching
+PSEUDO_FSTYPES = frozenset((
+    'autofs', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs', 'devpts',
+    'devtmpfs', 'efivarfs', 'fusectl', 'hugetlbfs', 'mqueue', 'nsfs', 'proc', 'pstore',
+    'ramfs', 'rpc_pipefs', 'securityfs', 'squashfs', 'sysfs', 'tracefs'
+))
+
+_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+def _unescape(field):
+    """Decode the octal escapes mountinfo uses for spaces and tabs in paths"""
+    return _ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), field)
+
+class Mount:
+    __slots__ = ('device', 'root', 'mountpoint', 'fstype', 'source')
+
+    def __init__(self, device, root, mountpoint, fstype, source):
+        self.device = device
+        self.root = root
+        self.mountpoint = mountpoint
+        self.fstype = fstype
+        self.source = source
+
+def parse_mountinfo(text):
+    """Parse /proc/<pid>/mountinfo into Mount records, in mount order"""
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split(' ')
+        try:
+            # Optional tag fields end at the '-' separator
+            separator = fields.index('-', 6)
+            mounts.append(Mount(fields[2], _unescape(fields[3]), _unescape(fields[4]),
+                                fields[separator + 1], _unescape(fields[separator + 2])))
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+def mount_for(path, mountpoints):
+    """Return the mountpoint among `mountpoints` that contains path (longest prefix)"""
+    best = None
+    for mountpoint in mountpoints:
+        prefix = mountpoint.rstrip('/') + '/'
+        if (path == mountpoint or path.startswith(prefix)) and (best is None or len(mountpoint) > len(best)):
+            best = mountpoint
+    return best
+
+class MountTable:
+    """Parsed mount table, re-read only when the kernel reports it changed.
+
+    The kernel flags POLLPRI on an open mountinfo file whenever a mount or
+    unmount happens in the namespace, so a zero-timeout poll tells us if the
+    cached parse is stale. Where that is unavailable the table is re-read
+    every `refresh_interval` seconds instead.
+    """
+
+    def __init__(self, path=MOUNTINFO, refresh_interval=60):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.file = None
+        self.poller = None
+        self.cached = None
+        self.loaded_at = 0.0
+        self.reloads = 0
+        try:
+            self.file = open(path, 'rb')
+            self.poller = select.poll()
+            self.poller.register(self.file.fileno(), select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):
+            self.poller = None
+
+    def _changed(self):
+        if self.cached is None:
+            return True
+        if self.poller is not None:
+            return bool(self.poller.poll(0))
+        return time.monotonic() - self.loaded_at > self.refresh_interval
+
+    def mounts(self):
+        if self._changed():
+            if self.file is not None:
+                # Reading from the start also clears the pending change event
+                self.file.seek(0)
+                text = self.file.read().decode('utf-8', errors='replace')
+            else:
+                with open(self.path, 'rb') as f:
+                    text = f.read().decode('utf-8', errors='replace')
+            self.cached = parse_mountinfo(text)
+            self.loaded_at = time.monotonic()
+            self.reloads += 1
+        return self.cached
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class DiskUsageCollector:
+    """Bytes and inode usage per mountpoint, one statvfs per distinct device.
+
+    With `mountpoints` unset every real filesystem is reported once, bind
+    mounts and pseudo filesystems left out. Configured mountpoints are always
+    reported, but mounts sharing a device still share a single statvfs.
+    """
+
+    def __init__(self, mountpoints=None, table=None):
+        self.mountpoints = list(mountpoints) if mountpoints else None
+        self.table = table or MountTable()
+
+    def _selected(self):
+        mounts = self.table.mounts()
+        if self.mountpoints is not None:
+            # Later mounts shadow earlier ones on the same mountpoint
+            by_path = {mount.mountpoint: mount for mount in mounts}
+            return [by_path[path] for path in self.mountpoints if path in by_path]
+
+        selected = {}
+        for mount in mounts:
+            if mount.fstype in PSEUDO_FSTYPES or mount.fstype.startswith('fuse.'):
+                continue
+            current = selected.get(mount.device)
+            # Prefer the mount of the filesystem root over bind mounts of subtrees
+            if current is None or (mount.root == '/' and current.root != '/'):
+                selected[mount.device] = mount
+        return sorted(selected.values(), key=lambda mount: mount.mountpoint)
+
+    @staticmethod
+    def _statvfs(path):
+        stat = os.statvfs(path)
+        used = (stat.f_blocks - stat.f_bfree) * stat.f_frsize
+        available = stat.f_bavail * stat.f_frsize
+        capacity = used + available
+        inodes_used = stat.f_files - stat.f_ffree
+        return {
+            'percent': round(used / capacity * 100, 1) if capacity else 0.0,
+            'used': used,
+            'total': stat.f_blocks * stat.f_frsize,
+            'inodes_percent': round(inodes_used / stat.f_files * 100, 1) if stat.f_files else 0.0,
+            'inodes_used': inodes_used,
+            'inodes_total': stat.f_files
+        }
+
+    def usage(self):
+        """Return {mountpoint: usage dict} for the selected mounts"""
+        by_device = {}
+        results = {}
+        for mount in self._selected():
+            usage = by_device.get(mount.device)
+            if usage is None:
+                try:
+                    usage = by_device[mount.device] = self._statvfs(mount.mountpoint)
+                except OSError:
+                    continue
+            results[mount.mountpoint] = usage
+        return results
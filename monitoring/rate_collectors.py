@@ -0,0 +1,148 @@
+import time
+from abc import ABC, abstractmethod
+import psutil
+
+# Block devices that only mirror other I/O or sit in memory
+IGNORED_DISK_PREFIXES = ('loop', 'ram', 'zram', 'dm-')
+
+class RateCollector(ABC):
+    """Turn monotonically increasing counters into per-second rates.
+
+    Each call snapshots the counters and divides the change since the previous
+    snapshot by the elapsed monotonic time. The first call only primes the
+    baseline; a counter that goes backwards (device reset, wrap) restarts it.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.last = None
+        self.last_time = None
+
+    @abstractmethod
+    def read(self):
+        """Return {name: counters namedtuple}"""
+
+    @abstractmethod
+    def rates(self, name, previous, current, elapsed):
+        """Return the rates of one counter set over `elapsed` seconds"""
+
+    def collect(self):
+        now = self.clock()
+        current = self.read()
+        previous, elapsed = self.last, now - self.last_time if self.last_time else 0
+        self.last, self.last_time = current, now
+        if not previous or elapsed <= 0:
+            return {}
+
+        results = {}
+        for name, counters in current.items():
+            before = previous.get(name)
+            if before is None or any(now_value < then for now_value, then in zip(counters, before)):
+                continue
+            results[name] = self.rates(name, before, counters, elapsed)
+        return results
+
+class DiskIOCollector(RateCollector):
+    """Per-disk IOPS, throughput, average latency and utilisation"""
+
+    def read(self):
+        counters = psutil.disk_io_counters(perdisk=True, nowrap=True) or {}
+        return {name: c for name, c in counters.items() if not name.startswith(IGNORED_DISK_PREFIXES)}
+
+    def rates(self, name, previous, current, elapsed):
+        reads = current.read_count - previous.read_count
+        writes = current.write_count - previous.write_count
+        io_time = (current.read_time - previous.read_time) + (current.write_time - previous.write_time)
+        rates = {
+            'read_iops': round(reads / elapsed, 1),
+            'write_iops': round(writes / elapsed, 1),
+            'read_bytes_per_s': round((current.read_bytes - previous.read_bytes) / elapsed),
+            'write_bytes_per_s': round((current.write_bytes - previous.write_bytes) / elapsed),
+            # read_time/write_time are cumulative milliseconds spent on requests
+            'latency_ms': round(io_time / (reads + writes), 2) if reads + writes else 0.0
+        }
+        if hasattr(current, 'busy_time'):
+            busy = (current.busy_time - previous.busy_time) / 1000
+            rates['busy_percent'] = round(min(100.0, busy / elapsed * 100), 1)
+        return rates
+
+class NetworkCollector(RateCollector):
+    """Per-interface bytes, packets, errors and drops per second"""
+
+    def read(self):
+        counters = psutil.net_io_counters(pernic=True, nowrap=True) or {}
+        return {name: c for name, c in counters.items() if name != 'lo'}
+
+    def rates(self, name, previous, current, elapsed):
+        def per_second(field):
+            return round((getattr(current, field) - getattr(previous, field)) / elapsed, 1)
+
+        return {
+            'rx_bytes_per_s': per_second('bytes_recv'),
+            'tx_bytes_per_s': per_second('bytes_sent'),
+            'rx_packets_per_s': per_second('packets_recv'),
+            'tx_packets_per_s': per_second('packets_sent'),
+            'errors_per_s': round(per_second('errin') + per_second('errout'), 1),
+            'drops_per_s': round(per_second('dropin') + per_second('dropout'), 1)
+        }
+
+class ProcessCollector:
+    """Top processes by CPU, resident memory and I/O throughput.
+
+    psutil.process_iter keeps its Process objects between calls (and drops
+    them on PID reuse), so each cycle only pays for one oneshot() read of the
+    attributes below per process. CPU and I/O rates come from deltas against
+    the previous cycle, keyed by (pid, create_time).
+    """
+
+    ATTRS = ['name', 'create_time', 'cpu_times', 'memory_info', 'io_counters']
+
+    def __init__(self, top_n=5, clock=time.monotonic):
+        self.top_n = top_n
+        self.clock = clock
+        self.last = {}
+        self.last_time = None
+
+    def collect(self):
+        now = self.clock()
+        elapsed = now - self.last_time if self.last_time else 0
+        current = {}
+        rows = []
+        for process in psutil.process_iter(self.ATTRS):
+            info = process.info
+            if info['cpu_times'] is None:
+                continue
+            key = (process.pid, info['create_time'])
+            cpu = info['cpu_times'].user + info['cpu_times'].system
+            io = info['io_counters']
+            io_bytes = io.read_bytes + io.write_bytes if io is not None else None
+            current[key] = (cpu, io_bytes)
+
+            previous = self.last.get(key)
+            if previous is None or elapsed <= 0:
+                continue
+            io_rate = 0.0
+            if io_bytes is not None and previous[1] is not None:
+                io_rate = max(0, io_bytes - previous[1]) / elapsed
+            rows.append({
+                'pid': process.pid,
+                'name': info['name'],
+                'cpu_percent': round(max(0.0, cpu - previous[0]) / elapsed * 100, 1),
+                'rss': info['memory_info'].rss if info['memory_info'] else 0,
+                'io_bytes_per_s': round(io_rate)
+            })
+
+        self.last = current
+        self.last_time = now
+        if not rows:
+            return {}
+
+        def top(field):
+            return sorted(rows, key=lambda row: row[field], reverse=True)[:self.top_n]
+
+        return {
+            'count': len(current),
+            'top_cpu': top('cpu_percent'),
+            'top_rss': top('rss'),
+            'top_io': top('io_bytes_per_s')
+        }
@@ -0,0 +1,327 @@
+import math
+import operator
+import re
+import time
+import warnings
+from collections import deque
+from utils.records import Alert, AlertKind
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+WINDOW_REDUCERS = ('avg', 'min', 'max', 'rate')
+PERCENTILE = re.compile(r'p(\d{1,2})$')
+
+class Rule:
+    """A threshold on one flattened metric name, or on every name a pattern matches.
+
+    `metric` uses MetricStore.flatten names ('cpu', 'disk_mounts./data.percent');
+    each '*' matches one variable part, which becomes the alert's resource
+    unless `resource` fixes it (generic 'metric' alerts use the full name).
+    `reduce` is 'last' or, over the last `window` seconds, 'avg', 'min',
+    'max', 'rate' (change per second) or a percentile such as 'p95'.
+    `overrides` maps a resource to its own threshold.
+    """
+
+    def __init__(self, metric, kind='metric', threshold=0, op='>', reduce='last', window=0,
+                 ceiling=None, resource=None, overrides=None):
+        if op not in OPERATORS:
+            raise ValueError(f"unknown operator {op!r}")
+        if reduce != 'last' and reduce not in WINDOW_REDUCERS and not PERCENTILE.match(reduce):
+            raise ValueError(f"unknown reducer {reduce!r}")
+        self.metric = metric
+        self.kind = AlertKind(kind)
+        self.threshold = threshold
+        self.op = op
+        self.reduce = reduce
+        self.window = window if reduce != 'last' else 0
+        self.ceiling = ceiling
+        self.resource = resource
+        self.overrides = overrides or {}
+        self.pattern = re.compile('^' + '(.+)'.join(map(re.escape, metric.split('*'))) + '$')
+
+    def expand(self, names):
+        """Yield (name, resource, threshold) for every metric name the rule covers"""
+        for name in names:
+            match = self.pattern.match(name)
+            if match is None:
+                continue
+            if self.resource:
+                resource = self.resource
+            elif self.kind == AlertKind.METRIC:
+                # Generic alerts are only identifiable by the metric itself
+                resource = name
+            else:
+                resource = '.'.join(match.groups()) or name
+            yield name, resource, self.overrides.get(resource, self.threshold)
+
+def _percentile(values, q):
+    """Linear-interpolated percentile, as numpy.percentile computes it"""
+    values = sorted(values)
+    k = (len(values) - 1) * q / 100
+    low = math.floor(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+class ListWindow:
+    """Recent metric vectors as Python lists, for when NumPy is not installed"""
+
+    def __init__(self, capacity):
+        self.rows = deque(maxlen=capacity)
+
+    def push(self, ts, values):
+        self.rows.append((ts, values))
+
+    def remap(self, keep):
+        """Keep only the given columns, in that order"""
+        self.rows = deque(
+            ((ts, [row[col] if col < len(row) else math.nan for col in keep]) for ts, row in self.rows),
+            maxlen=self.rows.maxlen
+        )
+
+    def reduce(self, reducer, cols, window, now):
+        if not self.rows:
+            return [math.nan] * len(cols)
+        if reducer == 'last':
+            row = self.rows[-1][1]
+            return [row[col] for col in cols]
+
+        rows = [(ts, row) for ts, row in self.rows if ts >= now - window]
+        if reducer == 'rate':
+            if len(rows) < 2 or rows[-1][0] <= rows[0][0]:
+                return [math.nan] * len(cols)
+            (first_ts, first), (last_ts, last) = rows[0], rows[-1]
+            elapsed = last_ts - first_ts
+            return [(last[col] - first[col]) / elapsed if col < len(first) else math.nan for col in cols]
+
+        results = []
+        for col in cols:
+            values = [row[col] for _, row in rows if col < len(row) and not math.isnan(row[col])]
+            if not values:
+                results.append(math.nan)
+            elif reducer == 'avg':
+                results.append(sum(values) / len(values))
+            elif reducer == 'min':
+                results.append(min(values))
+            elif reducer == 'max':
+                results.append(max(values))
+            else:
+                results.append(_percentile(values, int(reducer[1:])))
+        return results
+
+class ArrayWindow:
+    """Recent metric vectors in a NumPy ring buffer, one row per evaluation"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.rows = numpy.full((capacity, 0), numpy.nan)
+        self.timestamps = numpy.full(capacity, -numpy.inf)
+        self.position = 0
+        self.count = 0
+
+    def push(self, ts, values):
+        if len(values) > self.rows.shape[1]:
+            grown = numpy.full((self.capacity, len(values)), numpy.nan)
+            grown[:, :self.rows.shape[1]] = self.rows
+            self.rows = grown
+        self.rows[self.position] = values
+        self.timestamps[self.position] = ts
+        self.position = (self.position + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def remap(self, keep):
+        """Keep only the given columns, in that order"""
+        self.rows = self.rows[:, keep] if keep else numpy.full((self.capacity, 0), numpy.nan)
+
+    def _recent(self, window, now):
+        """Row indices inside the window, oldest first"""
+        order = (numpy.arange(self.count) + self.position - self.count) % self.capacity
+        return order[self.timestamps[order] >= now - window]
+
+    def reduce(self, reducer, cols, window, now):
+        if not self.count:
+            return numpy.full(len(cols), numpy.nan)
+        if reducer == 'last':
+            return self.rows[(self.position - 1) % self.capacity, cols]
+
+        recent = self._recent(window, now)
+        if reducer == 'rate':
+            if len(recent) < 2:
+                return numpy.full(len(cols), numpy.nan)
+            elapsed = self.timestamps[recent[-1]] - self.timestamps[recent[0]]
+            if elapsed <= 0:
+                return numpy.full(len(cols), numpy.nan)
+            return (self.rows[recent[-1], cols] - self.rows[recent[0], cols]) / elapsed
+
+        data = self.rows[numpy.ix_(recent, cols)]
+        if not len(data):
+            return numpy.full(len(cols), numpy.nan)
+        # All-NaN columns (metrics absent from the window) just yield NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if reducer == 'avg':
+                return numpy.nanmean(data, axis=0)
+            if reducer == 'min':
+                return numpy.nanmin(data, axis=0)
+            if reducer == 'max':
+                return numpy.nanmax(data, axis=0)
+            return numpy.nanpercentile(data, int(reducer[1:]), axis=0)
+
+class RuleEngine:
+    """Evaluate threshold rules over the metrics dict as grouped vector comparisons.
+
+    Each evaluation takes the cycle's metrics already flattened by
+    MetricStore.flatten and appends them as one vector to a ring buffer of
+    the last `history` evaluations. Rules are expanded against
+    the known metric names and compiled into groups sharing a reducer, window
+    and operator, each holding arrays of columns and thresholds; a group is
+    one reduction and one comparison per tick however many rules it holds.
+    Compilation only reruns when a new metric name appears. NumPy is
+    optional: without it the same groups are evaluated with plain lists,
+    which gives the same alerts but is much slower on large rule sets.
+    """
+
+    def __init__(self, rules, history=360, hysteresis=None, vectorized=True):
+        self.rules = [rule if isinstance(rule, Rule) else Rule(**rule) for rule in rules]
+        self.hysteresis = {AlertKind(kind): band for kind, band in (hysteresis or {}).items()}
+        self.vectorized = vectorized and numpy is not None
+        if vectorized and numpy is None:
+            print("NumPy is not installed; evaluating alert rules with plain lists")
+        self.window = ArrayWindow(history) if self.vectorized else ListWindow(history)
+        self.columns = {}
+        self.groups = None
+        # (kind, resource) -> (group, position) of the rule reporting it,
+        # and each group's values from the last evaluation
+        self.locations = {}
+        self.last_values = []
+        self.evaluations = 0
+        self.last_eval_ms = 0.0
+
+    def _array(self, values, dtype=float):
+        return numpy.array(values, dtype=dtype) if self.vectorized else values
+
+    def _compile(self):
+        groups = {}
+        locations = {}
+        for order, rule in enumerate(self.rules):
+            sign = 1 if rule.op in ('>', '>=') else -1
+            band = self.hysteresis.get(rule.kind, 0)
+            for name, resource, threshold in rule.expand(self.columns):
+                key = (rule.reduce, rule.window, rule.op)
+                group = groups.setdefault(key, {
+                    'cols': [], 'thresholds': [], 'relaxed': [], 'targets': []
+                })
+                # Like check_thresholds, the last rule for a resource wins
+                locations[(rule.kind, resource)] = (key, len(group['cols']))
+                group['cols'].append(self.columns[name])
+                group['thresholds'].append(threshold)
+                # While an alert is active it holds until the value clears the band
+                group['relaxed'].append(threshold - sign * band)
+                group['targets'].append((order, self.columns[name], rule, resource, threshold))
+
+        order = {key: i for i, key in enumerate(groups)}
+        self.locations = {target: (order[key], i) for target, (key, i) in locations.items()}
+        self.last_values = []
+        self.groups = []
+        for (reducer, window, op), group in groups.items():
+            hysteresis = group['relaxed'] != group['thresholds']
+            self.groups.append({
+                'reducer': reducer,
+                'window': window,
+                'op': OPERATORS[op],
+                'cols': self._array(group['cols'], int),
+                'thresholds': self._array(group['thresholds']),
+                'relaxed': self._array(group['relaxed']) if hysteresis else None,
+                'targets': group['targets']
+            })
+
+    def _record(self, values, ts):
+        """Append the metrics vector, growing or compacting the column layout as names change"""
+        new_names = [name for name in values if name not in self.columns]
+        if len(self.columns) + len(new_names) > 2 * len(values) + 64:
+            # Mostly columns of metrics that are gone (unplugged disks,
+            # renamed interfaces): drop them instead of growing forever
+            keep = [name for name in self.columns if name in values]
+            self.window.remap([self.columns[name] for name in keep])
+            self.columns = {name: col for col, name in enumerate(keep)}
+            new_names = [name for name in values if name not in self.columns]
+            self.groups = None
+        for name in new_names:
+            self.columns[name] = len(self.columns)
+        if new_names:
+            self.groups = None
+
+        row = [math.nan] * len(self.columns)
+        for name, value in values.items():
+            row[self.columns[name]] = value
+        self.window.push(ts, row)
+
+    def _hits(self, op, values, thresholds):
+        if self.vectorized:
+            return numpy.flatnonzero(op(values, thresholds)).tolist()
+        return [i for i, (value, threshold) in enumerate(zip(values, thresholds)) if op(value, threshold)]
+
+    def evaluate(self, values, ts=None, is_active=None):
+        """Record this tick's metrics and return an Alert for every rule they breach.
+
+        `values` is {flattened name: value}, as MetricStore.flatten yields.
+        `is_active(kind, resource)` tells whether an alert is already pending
+        or firing, which lets it hold within its hysteresis band.
+        """
+        started = time.perf_counter()
+        ts = time.time() if ts is None else ts
+        self._record(values, ts)
+        if self.groups is None:
+            self._compile()
+
+        hits = []
+        self.last_values = []
+        for group in self.groups:
+            values = self.window.reduce(group['reducer'], group['cols'], group['window'], ts)
+            self.last_values.append(values)
+            indexes = self._hits(group['op'], values, group['thresholds'])
+            if group['relaxed'] is not None and is_active is not None:
+                breached = set(indexes)
+                for i in self._hits(group['op'], values, group['relaxed']):
+                    _, _, rule, resource, _ = group['targets'][i]
+                    if i not in breached and is_active(rule.kind, resource):
+                        indexes.append(i)
+            for i in indexes:
+                hits.append((group['targets'][i], float(values[i])))
+
+        alerts = []
+        # Report in rule order, then metric order, like a hand-written check list
+        for (_, _, rule, resource, threshold), value in sorted(hits, key=lambda hit: hit[0][:2]):
+            if rule.reduce != 'last':
+                value = round(value, 2)
+            alerts.append(Alert.build(rule.kind, resource, value, threshold, rule.ceiling, ts))
+
+        self.evaluations += 1
+        self.last_eval_ms = (time.perf_counter() - started) * 1000
+        return alerts
+
+    def value(self, kind, resource):
+        """Last evaluated reading behind (kind, resource), breaching or not; None if unknown"""
+        location = self.locations.get((kind, resource))
+        if location is None or location[0] >= len(self.last_values):
+            return None
+        group, i = location
+        value = float(self.last_values[group][i])
+        if math.isnan(value):
+            return None
+        return value if self.groups[group]['reducer'] == 'last' else round(value, 2)
+
+    def stats(self):
+        groups = self.groups or []
+        return {
+            'rules': len(self.rules),
+            'targets': sum(len(group['targets']) for group in groups),
+            'groups': len(groups),
+            'metrics': len(self.columns),
+            'vectorized': self.vectorized,
+            'evaluations': self.evaluations,
+            'last_eval_ms': round(self.last_eval_ms, 3)
+        }
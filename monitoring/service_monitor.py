@@ -1,9 +1,31 @@
+import asyncio
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from monitoring.unit_events import UnitStateWatcher
+from utils.async_subprocess import run_command
+
+RUNNING_STATES = ('active', 'reloading')
 
 class ServiceMonitor:
-    def __init__(self, services_to_monitor):
+    def __init__(self, services_to_monitor, mode='batch', timeout=5, max_workers=8, bus_factory=None,
+                 on_change=None):
         self.services = services_to_monitor
-    
+        self.mode = mode
+        self.timeout = timeout
+        self.max_workers = max_workers
+        # Called with (service, running) when an event shows a unit starting or stopping
+        self.on_change = on_change
+        self.details = {}
+        self.watcher = None
+        if mode == 'events' and services_to_monitor:
+            self.watcher = UnitStateWatcher(services_to_monitor, bus_factory, on_change=self._unit_changed)
+            self.watcher.start()
+
+    def _unit_changed(self, service, old_state, new_state):
+        running = new_state in RUNNING_STATES
+        if self.on_change is not None and running != (old_state in RUNNING_STATES):
+            self.on_change(service, running)
+
     def check_service(self, service_name):
         """Check if a service is running"""
         try:
@@ -11,15 +33,152 @@ class ServiceMonitor:
                 ['systemctl', 'is-active', service_name],
                 capture_output=True,
                 text=True,
-                timeout=5
+                timeout=self.timeout
             )
             return result.returncode == 0
         except:
             return False
-    
+
+    @staticmethod
+    def parse_show_output(output, services):
+        """Split `systemctl show` output into one property dict per unit"""
+        blocks = []
+        current = {}
+        for line in output.splitlines():
+            if not line.strip():
+                if current:
+                    blocks.append(current)
+                    current = {}
+                continue
+            key, _, value = line.partition('=')
+            current[key] = value
+        if current:
+            blocks.append(current)
+
+        if len(blocks) != len(services):
+            raise ValueError(f"Expected {len(services)} units, got {len(blocks)}")
+
+        # systemctl prints one block per requested unit, in argument order
+        return dict(zip(services, blocks))
+
+    async def check_service_async(self, service_name):
+        """Check if a service is running without blocking the event loop"""
+        try:
+            returncode, _, _ = await run_command(['systemctl', 'is-active', service_name], self.timeout)
+            return returncode == 0
+        except (asyncio.TimeoutError, OSError):
+            return False
+
+    def _apply_show_properties(self, properties):
+        results = {}
+        for service, props in properties.items():
+            state = props.get('ActiveState', 'unknown')
+            self.details[service] = {
+                'active_state': state,
+                'sub_state': props.get('SubState', 'unknown'),
+                'main_pid': int(props.get('MainPID') or 0)
+            }
+            results[service] = state in RUNNING_STATES
+        return results
+
+    def check_services_from_events(self, services):
+        """Read states from the signal-driven table; None while it is unavailable"""
+        states = self.watcher.states_for(services) if self.watcher else None
+        if states is None:
+            return None
+        self.details.update(states)
+        return {service: state['active_state'] in RUNNING_STATES for service, state in states.items()}
+
+    def check_services_batch(self, services):
+        """Check all services with a single `systemctl show` invocation"""
+        result = subprocess.run(
+            ['systemctl', 'show', '--no-pager',
+             '--property=ActiveState,SubState,MainPID'] + list(services),
+            capture_output=True,
+            text=True,
+            timeout=self.timeout
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"systemctl exited with {result.returncode}")
+
+        return self._apply_show_properties(self.parse_show_output(result.stdout, services))
+
+    async def check_services_batch_async(self, services):
+        """Async variant of check_services_batch"""
+        returncode, stdout, stderr = await run_command(
+            ['systemctl', 'show', '--no-pager',
+             '--property=ActiveState,SubState,MainPID'] + list(services),
+            self.timeout
+        )
+        if returncode != 0:
+            raise RuntimeError(stderr.strip() or f"systemctl exited with {returncode}")
+        return self._apply_show_properties(self.parse_show_output(stdout, services))
+
+    def check_services_parallel(self, services):
+        """Check services concurrently, each with its own timeout"""
+        if not services:
+            return {}
+        workers = min(self.max_workers, len(services))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            statuses = executor.map(self.check_service, services)
+            return dict(zip(services, statuses))
+
+    async def check_services_parallel_async(self, services):
+        """Check services concurrently on the event loop, at most max_workers at once"""
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def check(service):
+            async with limit:
+                return await self.check_service_async(service)
+
+        statuses = await asyncio.gather(*(check(service) for service in services))
+        return dict(zip(services, statuses))
+
+    async def check_all_services_async(self):
+        """Async variant of check_all_services"""
+        if not self.services:
+            return {}
+
+        if self.mode == 'events':
+            statuses = self.check_services_from_events(self.services)
+            if statuses is not None:
+                return statuses
+
+        if self.mode in ('batch', 'events'):
+            try:
+                return await self.check_services_batch_async(self.services)
+            except (asyncio.TimeoutError, OSError, RuntimeError, ValueError):
+                return await self.check_services_parallel_async(self.services)
+
+        return await self.check_services_parallel_async(self.services)
+
     def check_all_services(self):
         """Check all configured services"""
+        if not self.services:
+            return {}
+
+        if self.mode == 'events':
+            statuses = self.check_services_from_events(self.services)
+            if statuses is not None:
+                return statuses
+            # Bus not connected (yet): poll with a batch call meanwhile
+
+        if self.mode in ('batch', 'events'):
+            try:
+                return self.check_services_batch(self.services)
+            except Exception:
+                # A hung or failing batch call must not take every unit down
+                # with it; fall back to isolated per-service checks
+                return self.check_services_parallel(self.services)
+
+        if self.mode == 'parallel':
+            return self.check_services_parallel(self.services)
+
         results = {}
         for service in self.services:
             results[service] = self.check_service(service)
-        return results
\ No newline at end of file
+        return results
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.stop(timeout=2)
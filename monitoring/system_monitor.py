@@ -1,13 +1,102 @@
 import psutil
 from datetime import datetime
+from monitoring.mounts import DiskUsageCollector
+from monitoring.rate_collectors import DiskIOCollector, NetworkCollector, ProcessCollector
+
+class CpuSampler:
+    """Compute CPU usage from deltas between successive cpu_times snapshots"""
+
+    def __init__(self):
+        self.last_total = psutil.cpu_times()
+        self.last_per_cpu = psutil.cpu_times(percpu=True)
+        self.total_percent = 0.0
+        self.per_cpu_percent = [0.0] * len(self.last_per_cpu)
+
+    @staticmethod
+    def _split(times):
+        """Return (total, busy) time for one cpu_times snapshot"""
+        total = sum(times)
+        # guest time is already accounted for in user time on Linux
+        total -= getattr(times, 'guest', 0) + getattr(times, 'guest_nice', 0)
+        # Waiting on I/O is idle time, as psutil.cpu_percent counts it
+        return total, total - times.idle - getattr(times, 'iowait', 0)
+
+    def _percent(self, prev, curr, previous_percent):
+        prev_total, prev_busy = self._split(prev)
+        curr_total, curr_busy = self._split(curr)
+        total_delta = curr_total - prev_total
+        if total_delta <= 0:
+            # No ticks elapsed since the last snapshot, keep the last reading
+            return previous_percent
+        busy_delta = max(0.0, curr_busy - prev_busy)
+        return round(min(100.0, busy_delta / total_delta * 100), 1)
+
+    def sample(self):
+        """Take a snapshot and return (total %, [per-cpu %]) since the last one"""
+        total = psutil.cpu_times()
+        per_cpu = psutil.cpu_times(percpu=True)
+
+        self.total_percent = self._percent(self.last_total, total, self.total_percent)
+        if len(per_cpu) == len(self.last_per_cpu):
+            self.per_cpu_percent = [
+                self._percent(prev, curr, last)
+                for prev, curr, last in zip(self.last_per_cpu, per_cpu, self.per_cpu_percent)
+            ]
+        else:
+            # CPU hotplug: restart per-cpu deltas from this snapshot
+            self.per_cpu_percent = [0.0] * len(per_cpu)
+
+        self.last_total = total
+        self.last_per_cpu = per_cpu
+        return self.total_percent, self.per_cpu_percent
 
 class SystemMonitor:
+    def __init__(self, cpu_sampler='delta', disk_mounts=None, process_top_n=5):
+        self.cpu_sampler = CpuSampler() if cpu_sampler == 'delta' else None
+        # disk_mounts: mountpoints to report, or None for every real filesystem
+        self.disk_usage = DiskUsageCollector(disk_mounts)
+        self.disk_io = DiskIOCollector()
+        self.network_io = NetworkCollector()
+        self.processes = ProcessCollector(process_top_n)
+
+    def check_cpu(self):
+        """Get aggregate and per-core CPU usage"""
+        if self.cpu_sampler:
+            cpu, per_cpu = self.cpu_sampler.sample()
+        else:
+            per_cpu = psutil.cpu_percent(interval=1, percpu=True)
+            cpu = round(sum(per_cpu) / len(per_cpu), 1) if per_cpu else 0.0
+        return {'cpu': cpu, 'cpu_per_core': per_cpu}
+
     @staticmethod
-    def check_system():
+    def check_memory():
+        """Get memory usage"""
+        return {'memory': psutil.virtual_memory().percent}
+
+    def check_disk(self):
+        """Get root filesystem usage plus bytes and inodes for each mount"""
+        mounts = self.disk_usage.usage()
+        root = mounts.get('/')
+        disk = root['percent'] if root else psutil.disk_usage('/').percent
+        return {'disk': disk, 'disk_mounts': mounts}
+
+    def check_io(self):
+        """Get per-disk IOPS, throughput and latency since the last call"""
+        return {'disk_io': self.disk_io.collect()}
+
+    def check_network(self):
+        """Get per-interface traffic and error rates since the last call"""
+        return {'network': self.network_io.collect()}
+
+    def check_processes(self):
+        """Get the top processes by CPU, memory and I/O since the last call"""
+        return {'processes': self.processes.collect()}
+
+    def check_system(self):
         """Get basic system metrics"""
-        return {
-            'cpu': psutil.cpu_percent(interval=1),
-            'memory': psutil.virtual_memory().percent,
-            'disk': psutil.disk_usage('/').percent,
-            'timestamp': datetime.now().strftime("%H:%M:%S")
-        }
\ No newline at end of file
+        metrics = {}
+        metrics.update(self.check_cpu())
+        metrics.update(self.check_memory())
+        metrics.update(self.check_disk())
+        metrics['timestamp'] = datetime.now().strftime("%H:%M:%S")
+        return metrics
@@ -0,0 +1,231 @@
+import queue
+import time
+from threading import Event, Lock, Thread
+
+try:
+    from jeepney import DBusAddress, HeaderFields, MatchRule, new_method_call
+    from jeepney.bus_messages import message_bus
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import DBusErrorResponse, unwrap_msg
+except ImportError:
+    open_dbus_connection = None
+
+SYSTEMD_BUS_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+SERVICE_INTERFACE = 'org.freedesktop.systemd1.Service'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+
+# D-Bus property name -> ServiceMonitor.details field
+TRACKED_PROPERTIES = {'ActiveState': 'active_state', 'SubState': 'sub_state', 'MainPID': 'main_pid'}
+
+def unit_name(service):
+    """Map a configured service name to its systemd unit name"""
+    return service if '.' in service else f"{service}.service"
+
+def tracked(properties):
+    """Keep only the properties the state table stores"""
+    return {key: value for key, value in properties.items() if key in TRACKED_PROPERTIES}
+
+class SystemdBus:
+    """Blocking jeepney connection receiving systemd unit PropertiesChanged signals"""
+
+    def __init__(self):
+        if open_dbus_connection is None:
+            raise RuntimeError("jeepney is required for event-driven service checks")
+        self.connection = open_dbus_connection(bus='SYSTEM')
+        self.services_by_path = {}
+        self.filter = None
+
+    def _call(self, path, interface, method, signature=None, body=()):
+        address = DBusAddress(path, bus_name=SYSTEMD_BUS_NAME, interface=interface)
+        reply = self.connection.send_and_get_reply(new_method_call(address, method, signature, body))
+        return unwrap_msg(reply)
+
+    def _properties(self, path):
+        properties = {}
+        for interface in (UNIT_INTERFACE, SERVICE_INTERFACE):
+            try:
+                values = self._call(path, PROPERTIES_INTERFACE, 'GetAll', 's', (interface,))[0]
+            except DBusErrorResponse:
+                # Non-service units have no Service interface (and no MainPID)
+                continue
+            properties.update(tracked({key: value[1] for key, value in values.items()}))
+        return properties
+
+    def watch(self, services):
+        """Subscribe to unit signals and return the current properties of each service"""
+        self._call(SYSTEMD_PATH, MANAGER_INTERFACE, 'Subscribe')
+        # The bus delivers signals by well-known sender, but jeepney matches
+        # locally against the unique name, so the rule leaves sender out
+        rule = MatchRule(type='signal', interface=PROPERTIES_INTERFACE, member='PropertiesChanged',
+                         path_namespace=f"{SYSTEMD_PATH}/unit")
+        unwrap_msg(self.connection.send_and_get_reply(message_bus.AddMatch(rule)))
+        # Filter before reading state so no change between the two is lost
+        self.filter = self.connection.filter(rule, bufsize=4096)
+
+        states = {}
+        for service in services:
+            path = self._call(SYSTEMD_PATH, MANAGER_INTERFACE, 'LoadUnit', 's', (unit_name(service),))[0]
+            self.services_by_path[path] = service
+            states[service] = self._properties(path)
+        return states
+
+    def receive(self, timeout):
+        """Wait for the next change; return (service, properties) or None"""
+        try:
+            message = self.connection.recv_until_filtered(self.filter.queue, timeout=timeout)
+        except TimeoutError:
+            return None
+
+        path = message.header.fields.get(HeaderFields.path)
+        service = self.services_by_path.get(path)
+        if service is None:
+            return None
+
+        _, changed, invalidated = message.body
+        properties = tracked({key: value[1] for key, value in changed.items()})
+        if any(key in TRACKED_PROPERTIES for key in invalidated):
+            properties = self._properties(path)
+        return (service, properties) if properties else None
+
+    def close(self):
+        if self.filter is not None:
+            self.filter.close()
+        self.connection.close()
+
+class LocalBus:
+    """In-process stand-in for the systemd bus; emit() plays the part of a signal"""
+
+    def __init__(self, states=None):
+        self.states = {service: dict(props) for service, props in (states or {}).items()}
+        self.signals = queue.Queue()
+
+    def watch(self, services):
+        return {service: dict(self.states.get(service, {'ActiveState': 'inactive'})) for service in services}
+
+    def emit(self, service, **properties):
+        self.states.setdefault(service, {}).update(properties)
+        self.signals.put((service, properties))
+
+    def receive(self, timeout):
+        try:
+            return self.signals.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+class UnitStateWatcher:
+    """Keep an in-memory table of unit states current from systemd signals.
+
+    A background thread listens for PropertiesChanged on every watched unit,
+    so a crash reaches the table within a signal round trip and reading it
+    spawns no processes. If the bus connection drops, the watcher reports no
+    states (callers poll instead) and reconnects with exponential backoff.
+    `on_change(service, old_state, new_state)` is called from that thread
+    whenever a signal changes a unit's active state.
+    """
+
+    def __init__(self, services, bus_factory=None, reconnect_delay=5, max_reconnect_delay=300,
+                 on_change=None):
+        self.services = list(services)
+        self.bus_factory = bus_factory or SystemdBus
+        self.on_change = on_change
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.lock = Lock()
+        self.states = {}
+        self.healthy = False
+        self.stopping = Event()
+        self.thread = None
+        self.connections = 0
+        self.signals = 0
+        self.reconnects = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _update(self, service, properties):
+        """Apply changed properties; return the unit's (previous, current) active state"""
+        with self.lock:
+            state = self.states.setdefault(service, {
+                'active_state': 'unknown',
+                'sub_state': 'unknown',
+                'main_pid': 0
+            })
+            previous = state['active_state']
+            for key, value in properties.items():
+                field = TRACKED_PROPERTIES.get(key)
+                if field == 'main_pid':
+                    state[field] = int(value or 0)
+                elif field:
+                    state[field] = value
+            state['updated'] = time.time()
+            return previous, state['active_state']
+
+    def _listen(self):
+        bus = self.bus_factory()
+        try:
+            for service, properties in bus.watch(self.services).items():
+                self._update(service, properties)
+            self.connections += 1
+            self.healthy = True
+            while not self.stopping.is_set():
+                change = bus.receive(1.0)
+                if change is not None:
+                    self.signals += 1
+                    service, properties = change
+                    previous, current = self._update(service, properties)
+                    if self.on_change is not None and current != previous:
+                        self.on_change(service, previous, current)
+        finally:
+            self.healthy = False
+            bus.close()
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self.stopping.is_set():
+            connections = self.connections
+            try:
+                self._listen()
+            except Exception as e:
+                if str(e) != self.last_error:
+                    print(f"Service event watcher disconnected: {e}")
+                self.last_error = str(e)
+            if self.connections != connections:
+                # Only back off further while connecting keeps failing
+                delay = self.reconnect_delay
+            if self.stopping.wait(delay):
+                break
+            self.reconnects += 1
+            delay = min(self.max_reconnect_delay, delay * 2)
+
+    def states_for(self, services):
+        """Return {service: state} from the table, or None if it cannot be trusted"""
+        if not self.healthy:
+            return None
+        with self.lock:
+            if any(service not in self.states for service in services):
+                return None
+            return {service: dict(self.states[service]) for service in services}
+
+    def stats(self):
+        return {
+            'healthy': self.healthy,
+            'signals': self.signals,
+            'reconnects': self.reconnects,
+            'last_error': self.last_error
+        }
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import unittest
+from threading import Event, Thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.service_monitor import ServiceMonitor
+from monitoring.unit_events import LocalBus
+from utils.scheduler import Scheduler
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+class UnitEventsTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = LocalBus({
+            'cron': {'ActiveState': 'active', 'SubState': 'running', 'MainPID': 42},
+            'dbus': {'ActiveState': 'active', 'SubState': 'running', 'MainPID': 7}
+        })
+        self.changes = []
+        self.changed = Event()
+        self.monitor = ServiceMonitor(['cron', 'dbus'], mode='events', bus_factory=lambda: self.bus,
+                                      on_change=self._on_change)
+        self.assertTrue(wait_until(lambda: self.monitor.watcher.healthy))
+
+    def tearDown(self):
+        self.monitor.close()
+
+    def _on_change(self, service, running):
+        self.changes.append((service, running))
+        self.changed.set()
+
+    def test_initial_states_come_from_the_bus(self):
+        self.assertEqual(self.monitor.check_all_services(), {'cron': True, 'dbus': True})
+        self.assertEqual(self.monitor.details['cron']['main_pid'], 42)
+        self.assertEqual(self.changes, [])
+
+    def test_signal_updates_states_and_reports_the_change(self):
+        self.bus.emit('cron', ActiveState='failed', SubState='failed', MainPID=0)
+        self.assertTrue(self.changed.wait(5))
+        self.assertEqual(self.changes, [('cron', False)])
+        self.assertEqual(self.monitor.check_all_services(), {'cron': False, 'dbus': True})
+        self.assertEqual(self.monitor.watcher.stats()['signals'], 1)
+
+    def test_only_running_flips_are_reported(self):
+        self.bus.emit('cron', ActiveState='deactivating')
+        self.bus.emit('cron', ActiveState='inactive')
+        self.bus.emit('cron', SubState='dead')
+        self.bus.emit('cron', ActiveState='activating')
+        self.bus.emit('cron', ActiveState='active')
+        self.assertTrue(wait_until(lambda: self.monitor.watcher.stats()['signals'] == 5))
+        self.assertEqual(self.changes, [('cron', False), ('cron', True)])
+
+    def test_change_triggers_the_cycle_early(self):
+        scheduler = Scheduler()
+        cycles = []
+        scheduler.add('cycle', 3600, lambda: cycles.append(time.monotonic()))
+        self.monitor.on_change = lambda service, running: scheduler.trigger('cycle')
+        thread = Thread(target=scheduler.run_forever, daemon=True)
+        thread.start()
+        try:
+            self.assertTrue(wait_until(lambda: len(cycles) == 1))
+            self.bus.emit('dbus', ActiveState='failed')
+            self.assertTrue(wait_until(lambda: len(cycles) == 2))
+            self.assertEqual(scheduler.stats()['cycle']['triggered'], 1)
+        finally:
+            scheduler.stop()
+            scheduler.wakeup.set()
+            thread.join(2)
+
+class TriggerTest(unittest.TestCase):
+    def test_triggers_within_min_gap_merge_into_one_run(self):
+        now = [0.0]
+        scheduler = Scheduler(clock=lambda: now[0], sleep=lambda delay: None)
+        runs = []
+        scheduler.add('cycle', 3600, lambda: runs.append(now[0]))
+        scheduler.run_pending()
+
+        for now[0] in (1.0, 1.1, 1.2, 2.0):
+            scheduler.trigger('cycle', min_gap=5)
+            scheduler.run_pending()
+        self.assertEqual(runs, [0.0])
+
+        now[0] = 5.0
+        scheduler.run_pending()
+        self.assertEqual(runs, [0.0, 5.0])
+        self.assertEqual(scheduler.stats()['cycle']['triggered'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import asyncio
+
+async def run_command(args, timeout=None):
+    """Run a command without blocking the event loop.
+
+    Returns (returncode, stdout, stderr). On timeout or cancellation the child
+    process is killed and reaped before the exception propagates.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        raise
+    return (
+        process.returncode,
+        stdout.decode('utf-8', errors='replace'),
+        stderr.decode('utf-8', errors='replace')
+    )
@@ -0,0 +1,294 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+from collections import deque
+from threading import Lock, get_ident
+from utils.log_segments import SegmentManifest, index_path, open_segment, parse_timestamp
+from utils.records import AlertKind
+
+INDEX_VERSION = 1
+SERVICE_DOWN_PREFIX = 'Service down: '
+
+def item_service(item):
+    """Return the service a healing action or alert is about, if any"""
+    if isinstance(item, dict):
+        if item.get('service'):
+            return item['service']
+        if item.get('kind') == AlertKind.SERVICE_DOWN.value:
+            return item.get('resource')
+    elif isinstance(item, str) and item.startswith(SERVICE_DOWN_PREFIX):
+        # Free-text alert from an older log
+        return item[len(SERVICE_DOWN_PREFIX):]
+    return None
+
+def entry_services(entry):
+    """Return the services a log entry concerns"""
+    data = entry.get('data')
+    event_type = entry.get('type')
+    services = set()
+    if event_type in ('healing', 'alerts') and isinstance(data, list):
+        services.update(filter(None, map(item_service, data)))
+    elif event_type == 'services' and isinstance(data, dict):
+        # Every cycle lists every service; only index the ones that were down
+        services.update(name for name, running in data.items() if not running)
+    return services
+
+def narrow_to_service(entry, service):
+    """Copy of an entry keeping only the parts of its data about one service"""
+    data = entry.get('data')
+    if isinstance(data, dict):
+        data = {service: data[service]} if service in data else {}
+    elif isinstance(data, list):
+        data = [item for item in data if item_service(item) == service]
+    return dict(entry, data=data)
+
+class SegmentIndex:
+    """Sparse timestamp -> offset index plus type and service postings.
+
+    Offsets are into the uncompressed segment. Every `stride`-th entry is a
+    sparse point; postings list the offset of every entry of a type or about
+    a service. The Logger writes timestamps in order, so both are sorted.
+    """
+
+    def __init__(self, stride=256):
+        self.stride = stride
+        self.entries = 0
+        self.size = 0
+        self.sparse_ts = []
+        self.sparse_offsets = []
+        self.last_ts = None
+        self.types = {}
+        self.services = {}
+
+    def add(self, offset, entry):
+        ts = parse_timestamp(entry.get('timestamp'))
+        if ts is not None and (self.last_ts is None or ts > self.last_ts):
+            self.last_ts = ts
+        if self.entries % self.stride == 0 and self.last_ts is not None:
+            self.sparse_ts.append(self.last_ts)
+            self.sparse_offsets.append(offset)
+        self.entries += 1
+
+        self.types.setdefault(entry.get('type'), []).append(offset)
+        for service in entry_services(entry):
+            self.services.setdefault(service, []).append(offset)
+
+    def extend(self, f):
+        """Index complete lines from f, which must be positioned at self.size"""
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # still being written
+            offset = self.size
+            self.size += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                self.add(offset, entry)
+
+    def bounds(self, since=None, until=None):
+        """Return the [start, end) offset range that can hold entries in [since, until]"""
+        start, end = 0, self.size
+        if since is not None:
+            # The last sparse point before `since` and everything up to it are older
+            i = bisect_left(self.sparse_ts, since) - 1
+            if i >= 0:
+                start = self.sparse_offsets[i]
+        if until is not None:
+            j = bisect_right(self.sparse_ts, until)
+            if j < len(self.sparse_offsets):
+                end = self.sparse_offsets[j]
+        return start, end
+
+    def candidates(self, event_type=None, service=None, since=None, until=None):
+        """Offsets of entries matching type/service within the time bounds"""
+        postings = None
+        if event_type is not None:
+            postings = self.types.get(event_type, [])
+        if service is not None:
+            by_service = self.services.get(service, [])
+            postings = by_service if postings is None else sorted(set(postings).intersection(by_service))
+        start, end = self.bounds(since, until)
+        return postings[bisect_left(postings, start):bisect_left(postings, end)]
+
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'stride': self.stride,
+            'entries': self.entries,
+            'size': self.size,
+            'sparse': [self.sparse_ts, self.sparse_offsets],
+            'types': self.types,
+            'services': self.services
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError("unsupported index version")
+        index = cls(data['stride'])
+        index.entries = data['entries']
+        index.size = data['size']
+        index.sparse_ts, index.sparse_offsets = data['sparse']
+        index.last_ts = index.sparse_ts[-1] if index.sparse_ts else None
+        # JSON turns a None type key into "null"
+        index.types = {None if key == 'null' else key: value for key, value in data['types'].items()}
+        index.services = data['services']
+        return index
+
+def write_index(path, stride=256):
+    """Index a sealed segment and save the sidecar next to it; return the index"""
+    index = SegmentIndex(stride)
+    with open_segment(path) as f:
+        index.extend(f)
+    sidecar = index_path(path)
+    # The rotator and a query may index the same segment at once
+    tmp_path = f"{sidecar}.{get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f, separators=(',', ':'))
+    os.replace(tmp_path, sidecar)
+    return index
+
+class LogIndex:
+    """Query log events by time range, type and service without full scans.
+
+    Sealed segments get a sidecar index from the SegmentRotator when they are
+    sealed (or on first use, for segments sealed before that); the active
+    log file is indexed incrementally in memory.
+    Type and service queries read only the posted lines, and time ranges
+    seek straight to the nearest sparse point.
+    """
+
+    def __init__(self, log_file, stride=256):
+        self.log_file = log_file
+        self.stride = stride
+        self.manifest = SegmentManifest(log_file)
+        self.lock = Lock()
+        self.sealed = {}
+        self.active = SegmentIndex(stride)
+        self.active_inode = None
+        self.lines_read = 0
+
+    def _load_sealed(self, path):
+        index = self.sealed.get(path)
+        if index is not None:
+            return index
+
+        sidecar = index_path(path)
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                index = SegmentIndex.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            index = write_index(path, self.stride)
+
+        self.sealed[path] = index
+        return index
+
+    def _refresh_active(self):
+        try:
+            stat = os.stat(self.log_file)
+        except OSError:
+            self.active = SegmentIndex(self.stride)
+            self.active_inode = None
+            return None
+
+        if stat.st_ino != self.active_inode or stat.st_size < self.active.size:
+            # Rotated or truncated: the old file is a sealed segment now
+            self.active = SegmentIndex(self.stride)
+            self.active_inode = stat.st_ino
+        if stat.st_size > self.active.size:
+            with open(self.log_file, 'rb') as f:
+                f.seek(self.active.size)
+                self.active.extend(f)
+        return self.active
+
+    def _indexes(self, since, until):
+        """Return [(path, index)] for every segment that may overlap the window"""
+        indexes = []
+        for path in self.manifest.segments_between(since, until):
+            try:
+                indexes.append((path, self._load_sealed(path)))
+            except (OSError, RuntimeError) as e:
+                print(f"Could not index {path}: {e}")
+        active = self._refresh_active()
+        if active is not None:
+            indexes.append((self.log_file, active))
+        # Segments that were dropped by retention no longer need caching
+        live = {path for path, _ in indexes}
+        for path in [path for path in self.sealed if path not in live and not os.path.exists(path)]:
+            del self.sealed[path]
+        return indexes
+
+    def _read_offsets(self, path, offsets):
+        with open_segment(path) as f:
+            for offset in offsets:
+                f.seek(offset)
+                line = f.readline()
+                self.lines_read += 1
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def _read_range(self, path, start, end):
+        with open_segment(path) as f:
+            f.seek(start)
+            position = start
+            while position < end:
+                line = f.readline()
+                if not line:
+                    break
+                position += len(line)
+                self.lines_read += 1
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def query(self, since=None, until=None, event_type=None, service=None, limit=None):
+        """Return matching entries oldest first, at most the newest `limit` of them"""
+        with self.lock:
+            indexes = self._indexes(since, until)
+
+            if event_type is None and service is None:
+                readers = [self._read_range(path, *index.bounds(since, until)) for path, index in indexes]
+            else:
+                plans = [(path, index.candidates(event_type, service, since, until)) for path, index in indexes]
+                if limit is not None:
+                    # Only the newest candidates can make the cut; keep one
+                    # stride of slack for entries just past `until`
+                    plans = self._trim(plans, limit + self.stride)
+                readers = [self._read_offsets(path, offsets) for path, offsets in plans if offsets]
+
+            results = deque(maxlen=limit)
+            for reader in readers:
+                for entry in reader:
+                    if not isinstance(entry, dict):
+                        continue
+                    if event_type is not None and entry.get('type') != event_type:
+                        continue
+                    if since is not None or until is not None:
+                        ts = parse_timestamp(entry.get('timestamp'))
+                        if ts is None or (since is not None and ts < since) or (until is not None and ts > until):
+                            continue
+                    results.append(narrow_to_service(entry, service) if service is not None else entry)
+            return list(results)
+
+    @staticmethod
+    def _trim(plans, keep):
+        trimmed = []
+        for path, offsets in reversed(plans):
+            if keep <= 0:
+                break
+            trimmed.append((path, offsets[-keep:]))
+            keep -= len(offsets)
+        trimmed.reverse()
+        return trimmed
+
+    def stats(self):
+        return {
+            'sealed_segments': len(self.sealed),
+            'active_entries': self.active.entries,
+            'lines_read': self.lines_read
+        }
@@ -0,0 +1,173 @@
+import json
+import os
+import time
+from threading import Lock
+from utils.records import AlertKind, AlertState, ActionKind, action_kind, alert_kind
+
+SNAPSHOT_VERSION = 1
+
+class IncidentAggregator:
+    """Running incident, healing and recovery counters fed once per cycle.
+
+    Alerts arrive as state transitions; an incident is counted when an
+    (alert kind, resource) pair starts firing, so a long episode counts once.
+    Healing outcomes are counted per target, and the time from a service
+    going down to it running again accumulates into its MTTR. Every update
+    is O(1) per alert, action or service; the counters are written to a JSON
+    snapshot every `snapshot_interval` seconds and reloaded on start.
+    """
+
+    def __init__(self, snapshot_file=None, snapshot_interval=60, clock=time.time):
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self.clock = clock
+        self.lock = Lock()
+        # Bumped whenever incident or healing counts change, for chart caching
+        self.version = 0
+        self.last_saved = clock()
+        self.since = None
+        self.incidents = {}
+        # Not persisted: the alert tracker starts empty after a restart, and
+        # reports a still-breaching alert as a new firing
+        self.active_alerts = set()
+        # target -> {'success': n, 'failure': n, 'skipped': n}
+        self.healing = {}
+        # service -> {'down_since': ts or None, 'recoveries': n, 'downtime': seconds}
+        self.services = {}
+        if snapshot_file:
+            self.load()
+
+    def record(self, ts, services_status, alerts, actions):
+        """Fold one cycle's services status, alert transitions and healing actions into the counters"""
+        with self.lock:
+            if self.since is None:
+                self.since = ts
+
+            changed = bool(actions)
+            for alert in alerts:
+                kind = alert_kind(alert)
+                if isinstance(alert, dict):
+                    resource, state = alert.get('resource'), alert.get('state', AlertState.FIRING.value)
+                else:
+                    resource, state = alert.resource, alert.state.value
+                key = (kind.value, resource)
+                # Reported transitions alternate between firing and resolved,
+                # so a flapping notice replaces the opposite of the last one
+                if state == AlertState.RESOLVED.value or (
+                        state == AlertState.FLAPPING.value and key in self.active_alerts):
+                    self.active_alerts.discard(key)
+                elif state != AlertState.PENDING.value and key not in self.active_alerts:
+                    # Firing, or flapping in place of a firing
+                    self.active_alerts.add(key)
+                    self.incidents[kind.value] = self.incidents.get(kind.value, 0) + 1
+                    changed = True
+
+            for action in actions:
+                if isinstance(action, dict):
+                    target = action.get('service') or action.get('target', 'Unknown')
+                    success = action.get('success', False)
+                else:
+                    target, success = action.target, action.success
+                counts = self.healing.setdefault(target, {'success': 0, 'failure': 0, 'skipped': 0})
+                if action_kind(action) == ActionKind.SKIP_RESTART:
+                    counts['skipped'] += 1
+                else:
+                    counts['success' if success else 'failure'] += 1
+
+            for service, running in services_status.items():
+                state = self.services.setdefault(service, {'down_since': None, 'recoveries': 0, 'downtime': 0.0})
+                if not running and state['down_since'] is None:
+                    state['down_since'] = ts
+                elif running and state['down_since'] is not None:
+                    state['downtime'] += max(0.0, ts - state['down_since'])
+                    state['recoveries'] += 1
+                    state['down_since'] = None
+
+            if changed:
+                self.version += 1
+
+        if self.snapshot_file and self.clock() - self.last_saved >= self.snapshot_interval:
+            self.save()
+
+    def incident_counts(self):
+        """Return {AlertKind: incidents} for every kind seen"""
+        with self.lock:
+            return {AlertKind(kind): count for kind, count in self.incidents.items()}
+
+    def healing_totals(self):
+        """Return (successful, failed) restart and cleanup attempts across all targets"""
+        with self.lock:
+            success = sum(counts['success'] for counts in self.healing.values())
+            failure = sum(counts['failure'] for counts in self.healing.values())
+            return success, failure
+
+    def mttr(self, service):
+        """Mean seconds from down to running again, or None before the first recovery"""
+        with self.lock:
+            state = self.services.get(service)
+            if not state or not state['recoveries']:
+                return None
+            return state['downtime'] / state['recoveries']
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'version': SNAPSHOT_VERSION,
+                'since': self.since,
+                'saved_at': self.clock(),
+                'incidents': dict(self.incidents),
+                'healing': {target: dict(counts) for target, counts in self.healing.items()},
+                'services': {service: dict(state) for service, state in self.services.items()}
+            }
+
+    def summary(self):
+        """Counters in the shape served by /api/incidents"""
+        data = self.snapshot()
+        services = {}
+        for service, state in data['services'].items():
+            recoveries = state['recoveries']
+            services[service] = {
+                'down': state['down_since'] is not None,
+                'recoveries': recoveries,
+                'mttr_s': round(state['downtime'] / recoveries, 1) if recoveries else None,
+                'healing': data['healing'].get(service, {'success': 0, 'failure': 0, 'skipped': 0})
+            }
+        return {
+            'since': data['since'],
+            'incidents': data['incidents'],
+            'healing': data['healing'],
+            'services': services
+        }
+
+    def save(self):
+        """Write the counters atomically to the snapshot file"""
+        data = self.snapshot()
+        tmp_path = self.snapshot_file + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_file) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.snapshot_file)
+        except OSError as e:
+            print(f"Could not save incident snapshot: {e}")
+        self.last_saved = self.clock()
+
+    def load(self):
+        """Resume from the snapshot file; start empty if it is missing or unreadable"""
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != SNAPSHOT_VERSION:
+                raise ValueError("unsupported snapshot version")
+            with self.lock:
+                self.since = data['since']
+                self.incidents = data['incidents']
+                self.healing = data['healing']
+                self.services = data['services']
+                self.version += 1
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def close(self):
+        if self.snapshot_file:
+            self.save()
@@ -0,0 +1,119 @@
+import json
+import os
+from collections import deque
+
+
+class LogTailer:
+    """Incremental reader for the JSON-lines monitor log.
+
+    Remembers the byte offset and inode of the log file so each poll only
+    decodes lines appended since the previous one, and keeps the most recent
+    entries per event type in bounded ring buffers.
+    """
+
+    def __init__(self, log_file, maxlen=500, backfill_bytes=4 * 1024 * 1024):
+        self.log_file = log_file
+        self.maxlen = maxlen
+        self.backfill_bytes = backfill_bytes
+        self.file = None
+        self.offset = 0
+        self.inode = None
+        self.partial = b''
+        self.recent = deque(maxlen=maxlen)
+        self.by_type = {}
+        self.versions = {}
+
+    def _open(self):
+        try:
+            self.file = open(self.log_file, 'rb')
+        except OSError:
+            return False
+
+        stat = os.fstat(self.file.fileno())
+        first_open = self.inode is None
+        self.inode = stat.st_ino
+        self.offset = 0
+        self.partial = b''
+        if first_open and stat.st_size > self.backfill_bytes:
+            # First poll: only backfill the tail instead of the whole history
+            self.offset = stat.st_size - self.backfill_bytes
+            self.file.seek(self.offset - 1)
+            if self.file.read(1) != b'\n':
+                self.file.readline()  # drop the partial first line
+            self.offset = self.file.tell()
+        return True
+
+    def poll(self):
+        """Read and buffer lines appended since the last poll"""
+        try:
+            stat = os.stat(self.log_file)
+        except OSError:
+            stat = None
+
+        count = 0
+        if self.file is not None and (stat is None or stat.st_ino != self.inode):
+            # Rotated: finish the old file through the handle we still hold
+            count += self._drain()
+            self.file.close()
+            self.file = None
+
+        if self.file is None:
+            if stat is None or not self._open():
+                return count
+        elif stat.st_size < self.offset:
+            # Truncated in place: start over
+            self.offset = 0
+            self.partial = b''
+
+        return count + self._drain()
+
+    def _drain(self):
+        self.file.seek(self.offset)
+        chunk = self.file.read()
+        if not chunk:
+            return 0
+        self.offset += len(chunk)
+
+        lines = (self.partial + chunk).split(b'\n')
+        self.partial = lines.pop()
+
+        count = 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            self._append(entry)
+            count += 1
+        return count
+
+    def _append(self, entry):
+        self.recent.append(entry)
+        event_type = entry.get('type')
+        buffer = self.by_type.get(event_type)
+        if buffer is None:
+            buffer = self.by_type[event_type] = deque(maxlen=self.maxlen)
+        buffer.append(entry)
+        self.versions[event_type] = self.versions.get(event_type, 0) + 1
+
+    def version(self, event_type):
+        """Return a counter that changes whenever an event of this type arrives"""
+        return self.versions.get(event_type, 0)
+
+    def read(self, limit=100):
+        """Return the last `limit` entries of any type"""
+        return list(self.recent)[-limit:]
+
+    def events(self, event_type, limit=100):
+        """Return the last `limit` entries of one event type"""
+        buffer = self.by_type.get(event_type)
+        if not buffer:
+            return []
+        return list(buffer)[-limit:]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
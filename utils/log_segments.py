@@ -0,0 +1,249 @@
+import gzip
+import io
+import json
+import os
+import queue
+import time
+from datetime import datetime
+from threading import Lock, Thread
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+INDEX_SUFFIX = '.idx.json'
+
+def parse_timestamp(value):
+    """Convert a log entry ISO timestamp to epoch seconds"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def index_path(segment_path):
+    """Sidecar index path of a segment; compressing a segment keeps its index"""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if segment_path.endswith(suffix):
+            segment_path = segment_path[:-len(suffix)]
+            break
+    return segment_path + INDEX_SUFFIX
+
+def open_segment(path):
+    """Open a plain or compressed log segment for binary reading"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst segments")
+        # Buffered so callers can iterate lines and seek forward
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+class SegmentManifest:
+    """JSON manifest of sealed log segments and their time ranges"""
+
+    def __init__(self, log_file):
+        self.log_dir = os.path.dirname(log_file) or '.'
+        self.path = log_file + '.manifest.json'
+        self.lock = Lock()
+
+    def load(self):
+        """Return the list of segment records, oldest first"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('segments', [])
+        except (OSError, ValueError):
+            return []
+
+    def _save(self, segments):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': segments}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def update(self, func):
+        """Apply func to the segment list and persist the result atomically"""
+        with self.lock:
+            segments = func(self.load())
+            self._save(segments)
+            return segments
+
+    def segment_path(self, segment):
+        return os.path.join(self.log_dir, segment['file'])
+
+    def segments_between(self, start=None, end=None):
+        """Return paths of sealed segments overlapping [start, end], oldest first"""
+        paths = []
+        for segment in self.load():
+            if start is not None and segment.get('end') is not None and segment['end'] < start:
+                continue
+            if end is not None and segment.get('start') is not None and segment['start'] > end:
+                continue
+            paths.append(self.segment_path(segment))
+        return paths
+
+class SegmentRotator:
+    """Seal monitor.log into segments by size and wall-clock period.
+
+    Sealed segments are recorded in a manifest with their time range, then
+    indexed on a background thread. A compressed stream can only be read
+    from its start, so the newest `keep_uncompressed` segments, where most
+    queries land, stay plain and only older ones are compressed.
+    Retention limits drop the oldest segments.
+    """
+
+    def __init__(self, log_file, max_bytes=50 * 1024 * 1024, interval=86400,
+                 compression='gzip', max_segments=30, max_age=None, keep_uncompressed=2,
+                 index_stride=256):
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.interval = interval
+        if compression == 'zstd' and zstandard is None:
+            compression = 'gzip'
+        self.compression = compression if compression in COMPRESSION_SUFFIXES else None
+        self.max_segments = max_segments
+        self.max_age = max_age
+        self.keep_uncompressed = keep_uncompressed
+        self.index_stride = index_stride
+        self.manifest = SegmentManifest(log_file)
+        self.next_rollover = self._next_boundary(time.time())
+        self.pending = queue.Queue()
+        self.seal_thread = Thread(target=self._seal_loop, daemon=True)
+        self.seal_thread.start()
+
+    def _next_boundary(self, now):
+        """Next period boundary in local wall-clock time"""
+        if not self.interval:
+            return None
+        offset = time.localtime(now).tm_gmtoff
+        return ((now + offset) // self.interval + 1) * self.interval - offset
+
+    def should_rotate(self, size, now):
+        if size <= 0:
+            return False
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        return self.next_rollover is not None and now >= self.next_rollover
+
+    def rotate(self, start_ts, end_ts):
+        """Seal the active log file; the caller must have closed it"""
+        now = time.time()
+        self.next_rollover = self._next_boundary(now)
+        if not os.path.exists(self.log_file):
+            return None
+
+        stamp = datetime.fromtimestamp(start_ts or now).strftime('%Y%m%dT%H%M%S')
+        sealed = f"{self.log_file}.{stamp}"
+        counter = 1
+        while os.path.exists(sealed) or any(
+                os.path.exists(sealed + suffix) for suffix in COMPRESSION_SUFFIXES.values()):
+            sealed = f"{self.log_file}.{stamp}.{counter}"
+            counter += 1
+        os.rename(self.log_file, sealed)
+
+        record = {
+            'file': os.path.basename(sealed),
+            'start': start_ts,
+            'end': end_ts,
+            'bytes': os.path.getsize(sealed),
+            'compressed': None
+        }
+        self.manifest.update(lambda segments: self._apply_retention(segments + [record], now))
+        self.pending.put(record['file'])
+        return sealed
+
+    def _apply_retention(self, segments, now):
+        keep = segments
+        if self.max_age:
+            keep = [s for s in keep if s.get('end') is None or now - s['end'] <= self.max_age]
+        if self.max_segments and len(keep) > self.max_segments:
+            keep = keep[-self.max_segments:]
+
+        kept = {s['file'] for s in keep}
+        for segment in segments:
+            if segment['file'] not in kept:
+                path = self.manifest.segment_path(segment)
+                for doomed in (path, index_path(path)):
+                    try:
+                        os.remove(doomed)
+                    except OSError:
+                        pass
+        return keep
+
+    def _seal_loop(self):
+        while True:
+            name = self.pending.get()
+            if name is None:
+                self.pending.task_done()
+                return
+            try:
+                self._index(name)
+            except Exception as e:
+                print(f"Segment indexing failed for {name}: {e}")
+            if self.compression:
+                for older in self._compressible():
+                    try:
+                        self._compress(older)
+                    except Exception as e:
+                        print(f"Segment compression failed for {older}: {e}")
+            self.pending.task_done()
+
+    def _index(self, name):
+        # Imported here: the index reads segments through this module
+        from utils.event_index import write_index
+        path = os.path.join(self.manifest.log_dir, name)
+        if os.path.exists(path):
+            write_index(path, self.index_stride)
+
+    def _compressible(self):
+        """Plain segments older than the newest `keep_uncompressed`"""
+        segments = self.manifest.load()
+        older = segments[:-self.keep_uncompressed] if self.keep_uncompressed else segments
+        return [segment['file'] for segment in older if not segment.get('compressed')]
+
+    def _compress(self, name):
+        source = os.path.join(self.manifest.log_dir, name)
+        if not os.path.exists(source):
+            return  # already dropped by retention
+        target = source + COMPRESSION_SUFFIXES[self.compression]
+        tmp_target = target + '.tmp'
+
+        with open(source, 'rb') as src:
+            if self.compression == 'zstd':
+                with open(tmp_target, 'wb') as dst:
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+            else:
+                with gzip.open(tmp_target, 'wb') as dst:
+                    while True:
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+        os.replace(tmp_target, target)
+
+        found = []
+
+        def mark_compressed(segments):
+            for segment in segments:
+                if segment['file'] == name:
+                    segment['file'] = os.path.basename(target)
+                    segment['compressed'] = self.compression
+                    found.append(segment)
+            return segments
+
+        self.manifest.update(mark_compressed)
+        for path in ([source] if found else [source, target]):
+            # Without a manifest record the segment was dropped by retention
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        """Finish pending indexing and compression and stop the background thread"""
+        if self.seal_thread is not None:
+            self.pending.put(None)
+            self.seal_thread.join()
+            self.seal_thread = None
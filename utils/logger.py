@@ -1,15 +1,58 @@
 import json
 import os
+import queue
+import time
 from datetime import datetime
+from threading import Thread
+from utils.log_segments import SegmentRotator, parse_timestamp
+from utils.records import json_default
+
+DURABILITY_POLICIES = ('flush', 'interval', 'batch')
 
 class Logger:
-    def __init__(self, log_file):
+    def __init__(self, log_file, buffered=False, batch_size=100, flush_interval=1.0,
+                 durability='flush', fsync_interval_ms=1000, rotation=None):
         self.log_file = log_file
-        
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability if durability in DURABILITY_POLICIES else 'flush'
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.last_fsync = time.monotonic()
+        self.unsynced = False
+        self.queue = None
+        self.writer_thread = None
+        self.file = None
+
         log_dir = os.path.dirname(log_file)
         if log_dir:
             os.makedirs(log_dir, exist_ok=True)
-    
+
+        # rotation: dict of SegmentRotator options, or None to append forever
+        self.rotator = SegmentRotator(log_file, **rotation) if rotation is not None else None
+        self.size, self.first_ts, self.last_ts = self._scan_active_file()
+
+        if buffered:
+            self.file = open(self.log_file, 'a', encoding='utf-8')
+            self.queue = queue.Queue()
+            self.writer_thread = Thread(target=self._writer_loop, daemon=True)
+            self.writer_thread.start()
+
+    def _scan_active_file(self):
+        """Return (size, first timestamp, last timestamp) of the active log"""
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            return 0, None, None
+        if not size:
+            return 0, None, None
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            try:
+                first_ts = parse_timestamp(json.loads(f.readline()).get('timestamp'))
+            except (ValueError, AttributeError):
+                first_ts = None
+        return size, first_ts, os.path.getmtime(self.log_file)
+
     def log_event(self, event_type, data):
         """Log event to file"""
         log_entry = {
@@ -17,6 +60,108 @@ class Logger:
             'type': event_type,
             'data': data
         }
-        
+
+        if self.buffered:
+            self.queue.put(log_entry)
+            return
+
+        self._rotate_if_needed()
+        line = json.dumps(log_entry, default=json_default) + '\n'
         with open(self.log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
\ No newline at end of file
+            f.write(line)
+        self._track([log_entry], line)
+
+    def _track(self, entries, text):
+        """Update size and time range of the active segment"""
+        self.size += len(text.encode('utf-8'))
+        if self.first_ts is None:
+            self.first_ts = parse_timestamp(entries[0]['timestamp'])
+        self.last_ts = parse_timestamp(entries[-1]['timestamp'])
+
+    def _rotate_if_needed(self):
+        if self.rotator is None or not self.rotator.should_rotate(self.size, time.time()):
+            return
+        if self.file is not None:
+            self.file.close()
+        try:
+            self.rotator.rotate(self.first_ts, self.last_ts)
+        finally:
+            if self.file is not None:
+                self.file = open(self.log_file, 'a', encoding='utf-8')
+        self.size, self.first_ts, self.last_ts = 0, None, None
+
+    def _writer_loop(self):
+        """Drain the queue in batches until a None sentinel arrives"""
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self.queue.task_done()
+                    running = False
+                    break
+                batch.append(entry)
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"Logger write failed: {e}")
+                for _ in batch:
+                    self.queue.task_done()
+            elif self.unsynced:
+                # Idle: the last batch must not wait for the next write to be synced
+                try:
+                    self._sync_if_due()
+                except OSError as e:
+                    print(f"Logger fsync failed: {e}")
+
+    def _write_batch(self, batch):
+        """Serialize and write one batch, then apply the durability policy"""
+        self._rotate_if_needed()
+        text = ''.join(json.dumps(entry, default=json_default) + '\n' for entry in batch)
+        self.file.write(text)
+        self.file.flush()
+        self._track(batch, text)
+
+        if self.durability == 'batch':
+            os.fsync(self.file.fileno())
+        elif self.durability == 'interval':
+            self.unsynced = True
+            self._sync_if_due()
+
+    def _sync_if_due(self):
+        """fsync unsynced writes once fsync_interval has passed since the last sync"""
+        now = time.monotonic()
+        if now - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+            self.unsynced = False
+
+    def flush(self):
+        """Block until every queued event has been written"""
+        if self.buffered:
+            self.queue.join()
+
+    def close(self):
+        """Flush pending events and stop the background writer"""
+        if self.buffered and self.writer_thread is not None:
+            self.queue.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
+            self.buffered = False
+            self.file.flush()
+            if self.durability != 'flush':
+                os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+        if self.rotator is not None:
+            self.rotator.close()
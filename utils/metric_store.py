@@ -0,0 +1,262 @@
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from threading import Lock
+from utils.rollup import RollupManager
+
+SERIES_SUFFIX = '.ts'
+
+class _TimestampColumn:
+    """Sequence view of the timestamp column of a record buffer, for bisect"""
+
+    def __init__(self, view, width, count):
+        self.view = view
+        self.width = width
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.view[index * self.width]
+
+class SeriesFile:
+    """Append-only file of fixed-width float64 records: (epoch ts, *fields).
+
+    Appends are buffered until flush(), which opens the file for one write
+    and closes it again, so idle series hold no descriptor. Reads
+    memory-map the file, binary-search the timestamp column and slice the
+    requested range out of the map instead of parsing anything.
+    """
+
+    def __init__(self, path, fields=('value',), on_map=None):
+        self.path = path
+        self.fields = tuple(fields)
+        self.width = 1 + len(self.fields)
+        self.record = struct.Struct('<' + 'd' * self.width)
+        self.lock = Lock()
+        self.pending = []
+        self.map = None
+        self.mapped_size = 0
+        # Told about every read so the owner can cap how many maps stay open
+        self.on_map = on_map
+
+    def append(self, ts, *values):
+        """Buffer one record until the next flush"""
+        self.pending.append(self.record.pack(ts, *values))
+
+    def append_many(self, rows):
+        """Buffer (ts, *values) rows until the next flush"""
+        self.pending.extend(self.record.pack(*row) for row in rows)
+
+    def flush(self):
+        """Write buffered records with a single write"""
+        if not self.pending:
+            return
+        data, self.pending = b''.join(self.pending), []
+        with open(self.path, 'ab', buffering=0) as f:
+            f.write(data)
+
+    def replace_last(self, ts, *values):
+        """Overwrite the newest record, buffered or on disk"""
+        record = self.record.pack(ts, *values)
+        if self.pending:
+            self.pending[-1] = record
+            return
+        with self.lock:
+            size = os.path.getsize(self.path)
+            size -= size % self.record.size
+            if size == 0:
+                raise ValueError("no record to replace")
+            with open(self.path, 'r+b') as f:
+                f.seek(size - self.record.size)
+                f.write(record)
+            # Pages of the old map may still hold the previous bytes
+            self.release()
+
+    def release(self):
+        """Drop the cached map; it closes once no reader still holds a view of it"""
+        self.map = None
+        self.mapped_size = 0
+
+    def _view(self):
+        """Return (float64 memoryview, record count) over the whole file"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return None, 0
+        size -= size % self.record.size  # ignore a torn trailing record
+        if size == 0:
+            return None, 0
+        mapped = self.map
+        if mapped is None or size != self.mapped_size:
+            with open(self.path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self.map = mapped
+            self.mapped_size = size
+        if self.on_map is not None:
+            self.on_map(self)
+        return memoryview(mapped).cast('d'), size // self.record.size
+
+    def __len__(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        return size // self.record.size + len(self.pending)
+
+    def _slice(self, view, lo, hi):
+        rows = view[lo * self.width:hi * self.width]
+        columns = {'timestamp': rows[0::self.width].tolist()}
+        for i, field in enumerate(self.fields, start=1):
+            columns[field] = rows[i::self.width].tolist()
+        return columns
+
+    def _empty(self):
+        columns = {'timestamp': []}
+        for field in self.fields:
+            columns[field] = []
+        return columns
+
+    def _bounds(self, view, count, start, end):
+        column = _TimestampColumn(view, self.width, count)
+        lo = 0 if start is None else bisect_left(column, start)
+        hi = count if end is None else bisect_right(column, end)
+        return lo, max(lo, hi)
+
+    def count(self, start=None, end=None):
+        """Return the number of records with start <= ts <= end"""
+        with self.lock:
+            view, count = self._view()
+            if not count:
+                return 0
+            lo, hi = self._bounds(view, count, start, end)
+            return hi - lo
+
+    def range(self, start=None, end=None, limit=None):
+        """Return columns for records with start <= ts <= end (newest `limit` only)"""
+        with self.lock:
+            view, count = self._view()
+            if not count:
+                return self._empty()
+            lo, hi = self._bounds(view, count, start, end)
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            return self._slice(view, lo, hi)
+
+    def tail(self, limit):
+        """Return columns for the last `limit` records"""
+        with self.lock:
+            view, count = self._view()
+            if not count:
+                return self._empty()
+            return self._slice(view, max(0, count - limit), count)
+
+    def last(self):
+        """Return the last record as a dict, or None"""
+        columns = self.tail(1)
+        if not columns['timestamp']:
+            return None
+        return {name: values[0] for name, values in columns.items()}
+
+    def close(self):
+        self.flush()
+        self.release()
+
+class MetricStore:
+    """Directory of numeric series, one SeriesFile per metric name.
+
+    Each append() is written out at its end, one short-lived open per
+    series; only the `max_mapped` most recently read series keep a map (and
+    the descriptor it holds) open.
+    """
+
+    def __init__(self, directory, rollup_tiers=None, max_mapped=32):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.series_files = {}
+        self.lock = Lock()
+        self.max_mapped = max_mapped
+        self.mapped = OrderedDict()
+        self.map_lock = Lock()
+        self.rollups = RollupManager(self, rollup_tiers) if rollup_tiers else None
+
+    def _mapped(self, series):
+        """LRU bookkeeping of open maps, called on every read"""
+        with self.map_lock:
+            self.mapped[series.path] = series
+            self.mapped.move_to_end(series.path)
+            while len(self.mapped) > self.max_mapped:
+                _, evicted = self.mapped.popitem(last=False)
+                evicted.release()
+
+    @staticmethod
+    def _file_name(name):
+        return re.sub(r'[^A-Za-z0-9_.@-]', '_', name) + SERIES_SUFFIX
+
+    def series(self, name, fields=('value',)):
+        """Return the SeriesFile for a metric, creating it on first use"""
+        series = self.series_files.get(name)
+        if series is None:
+            with self.lock:
+                series = self.series_files.get(name)
+                if series is None:
+                    path = os.path.join(self.directory, self._file_name(name))
+                    series = self.series_files[name] = SeriesFile(path, fields, self._mapped)
+        return series
+
+    @staticmethod
+    def flatten(metrics, prefix=''):
+        """Yield (name, value) for every numeric metric; lists become name.N, dicts name.key"""
+        for name, value in metrics.items():
+            name = f"{prefix}{name}"
+            if isinstance(value, bool):
+                continue
+            if isinstance(value, (int, float)):
+                yield name, float(value)
+            elif isinstance(value, dict):
+                yield from MetricStore.flatten(value, f"{name}.")
+            elif isinstance(value, (list, tuple)):
+                for i, item in enumerate(value):
+                    if isinstance(item, (int, float)) and not isinstance(item, bool):
+                        yield f"{name}.{i}", float(item)
+
+    def append(self, ts, values):
+        """Append one sample per metric of a {name: value} dict, as flatten() yields"""
+        for name, value in values.items():
+            self.series(name).append(ts, value)
+            if self.rollups is not None:
+                self.rollups.add(ts, name, value)
+        self.flush()
+
+    def flush(self):
+        """Write every series' buffered records"""
+        for series in list(self.series_files.values()):
+            series.flush()
+
+    def query(self, name, start=None, end=None, limit=None):
+        """Return {'timestamp': [...], 'value': [...]} for a time range"""
+        return self.series(name).range(start, end, limit)
+
+    def tail(self, name, limit):
+        """Return the last `limit` samples of a metric"""
+        return self.series(name).tail(limit)
+
+    def query_window(self, name, start, end, max_points=300):
+        """Return at most ~max_points rows for a window, from raw or rollup data"""
+        if self.rollups is None:
+            columns = self.query(name, start, end)
+            columns['avg'] = columns['value']
+            columns['tier'] = 'raw'
+            return columns
+        return self.rollups.query(name, start, end, max_points)
+
+    def close(self):
+        if self.rollups is not None:
+            self.rollups.flush()
+        for series in list(self.series_files.values()):
+            series.close()
+        self.mapped.clear()
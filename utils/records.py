@@ -0,0 +1,169 @@
+import time
+from dataclasses import dataclass
+from enum import Enum
+
+class AlertKind(str, Enum):
+    HIGH_CPU = 'high_cpu'
+    HIGH_MEMORY = 'high_memory'
+    LOW_DISK = 'low_disk'
+    LOW_INODES = 'low_inodes'
+    IO_LATENCY = 'io_latency'
+    IO_UTILIZATION = 'io_utilization'
+    NETWORK_ERRORS = 'network_errors'
+    SERVICE_DOWN = 'service_down'
+    METRIC = 'metric'  # custom rule on any metric
+
+class Severity(str, Enum):
+    WARNING = 'warning'
+    CRITICAL = 'critical'
+
+class AlertState(str, Enum):
+    PENDING = 'pending'
+    FIRING = 'firing'
+    RESOLVED = 'resolved'
+    FLAPPING = 'flapping'
+
+class ActionKind(str, Enum):
+    RESTART_SERVICE = 'restart_service'
+    SKIP_RESTART = 'skip_restart'
+    CLEANUP_TEMP = 'cleanup_temp'
+
+# `where` is " on <resource>" except for the root filesystem
+ALERT_MESSAGES = {
+    AlertKind.HIGH_CPU: "High CPU: {value}%",
+    AlertKind.HIGH_MEMORY: "High Memory: {value}%",
+    AlertKind.LOW_DISK: "Low Disk{where}: {value}%",
+    AlertKind.LOW_INODES: "Low Disk Inodes{where}: {value}%",
+    AlertKind.IO_LATENCY: "High I/O Latency{where}: {value}ms",
+    AlertKind.IO_UTILIZATION: "High I/O Utilization{where}: {value}%",
+    AlertKind.NETWORK_ERRORS: "Network Errors{where}: {value}/s",
+    AlertKind.SERVICE_DOWN: "Service down: {resource}",
+    AlertKind.METRIC: "{resource}: {value}"
+}
+
+STATE_PREFIXES = {AlertState.RESOLVED: "Resolved: ", AlertState.FLAPPING: "Flapping: "}
+
+SERVICE_ACTIONS = (ActionKind.RESTART_SERVICE, ActionKind.SKIP_RESTART)
+
+def severity_for(value, threshold, ceiling=None):
+    """Critical past the midpoint between threshold and ceiling (or at twice the threshold)"""
+    if value is None or threshold is None:
+        return Severity.CRITICAL
+    critical_at = (threshold + ceiling) / 2 if ceiling is not None else threshold * 2
+    return Severity.CRITICAL if value >= critical_at else Severity.WARNING
+
+@dataclass
+class Alert:
+    __slots__ = ('kind', 'resource', 'value', 'threshold', 'severity', 'ts', 'state')
+    kind: AlertKind
+    resource: str
+    value: float
+    threshold: float
+    severity: Severity
+    ts: float
+    state: AlertState
+
+    @classmethod
+    def build(cls, kind, resource, value=None, threshold=None, ceiling=None, ts=None):
+        return cls(kind, resource, value, threshold, severity_for(value, threshold, ceiling),
+                   time.time() if ts is None else ts, AlertState.FIRING)
+
+    @property
+    def key(self):
+        return (self.kind, self.resource)
+
+    @property
+    def message(self):
+        where = "" if self.resource == '/' else f" on {self.resource}"
+        text = ALERT_MESSAGES[self.kind].format(value=self.value, resource=self.resource, where=where)
+        return STATE_PREFIXES.get(self.state, "") + text
+
+    def __str__(self):
+        return self.message
+
+    def to_dict(self):
+        return {
+            'kind': self.kind.value,
+            'resource': self.resource,
+            'value': self.value,
+            'threshold': self.threshold,
+            'severity': self.severity.value,
+            'ts': self.ts,
+            'state': self.state.value,
+            'message': self.message
+        }
+
+def _legacy_alert_kind(text):
+    """Classify a pre-structured free-text alert from an old log"""
+    text = text.lower()
+    if 'service down' in text or 'stopped' in text:
+        return AlertKind.SERVICE_DOWN
+    if 'cpu' in text:
+        return AlertKind.HIGH_CPU
+    if 'memory' in text:
+        return AlertKind.HIGH_MEMORY
+    if 'i/o' in text:
+        return AlertKind.IO_LATENCY
+    if 'network' in text:
+        return AlertKind.NETWORK_ERRORS
+    if 'inode' in text:
+        return AlertKind.LOW_INODES
+    return AlertKind.LOW_DISK
+
+def alert_kind(alert):
+    """Return the AlertKind of an Alert, its serialized dict or a legacy string"""
+    if isinstance(alert, Alert):
+        return alert.kind
+    if isinstance(alert, dict):
+        return AlertKind(alert['kind'])
+    return _legacy_alert_kind(str(alert))
+
+@dataclass
+class HealingAction:
+    __slots__ = ('kind', 'target', 'success', 'message', 'ts', 'latency_ms', 'details')
+    kind: ActionKind
+    target: str
+    success: bool
+    message: str
+    ts: float
+    latency_ms: float
+    details: dict
+
+    @classmethod
+    def build(cls, kind, target, success, message, latency_ms=0.0, ts=None, **details):
+        return cls(kind, target, success, message, time.time() if ts is None else ts, latency_ms, details)
+
+    def __str__(self):
+        return self.message
+
+    def to_dict(self):
+        data = {
+            'kind': self.kind.value,
+            'target': self.target,
+            'success': self.success,
+            'message': self.message,
+            'ts': self.ts,
+            'latency_ms': self.latency_ms
+        }
+        if self.kind in SERVICE_ACTIONS:
+            # Readers of older logs know restarts by their 'service' key
+            data['service'] = self.target
+        data.update(self.details)
+        return data
+
+def action_kind(action):
+    """Return the ActionKind of a HealingAction, its serialized dict or a legacy dict"""
+    if isinstance(action, HealingAction):
+        return action.kind
+    if 'kind' in action:
+        return ActionKind(action['kind'])
+    if action.get('type') == 'cleanup_temp':
+        return ActionKind.CLEANUP_TEMP
+    if str(action.get('message', '')).startswith('Skipped'):
+        return ActionKind.SKIP_RESTART
+    return ActionKind.RESTART_SERVICE
+
+def json_default(obj):
+    """json.dumps hook: serialize records with their kind, anything else as text"""
+    to_dict = getattr(obj, 'to_dict', None)
+    return to_dict() if to_dict is not None else str(obj)
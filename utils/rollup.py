@@ -0,0 +1,127 @@
+import math
+
+ROLLUP_FIELDS = ('min', 'max', 'avg', 'p95', 'count')
+DEFAULT_TIERS = (('1m', 60), ('5m', 300), ('1h', 3600))
+
+def summarize(values):
+    """Return (min, max, avg, p95, count) for a non-empty list of samples"""
+    ordered = sorted(values)
+    count = len(ordered)
+    p95 = ordered[max(0, math.ceil(0.95 * count) - 1)]
+    return ordered[0], ordered[-1], sum(ordered) / count, p95, count
+
+def merge_summaries(first, second):
+    """Combine two (min, max, avg, p95, count) summaries of disjoint samples.
+
+    min, max, avg and count are exact; the samples behind p95 are gone, so
+    the larger of the two is kept as an upper bound.
+    """
+    count = first[4] + second[4]
+    avg = (first[2] * first[4] + second[2] * second[4]) / count
+    return min(first[0], second[0]), max(first[1], second[1]), avg, max(first[3], second[3]), count
+
+def tier_series_name(name, tier):
+    return f"{name}@{tier}"
+
+class RollupManager:
+    """Maintain min/max/avg/p95 rollup buckets per metric as samples arrive.
+
+    Each tier keeps one open bucket per metric in memory; when a sample falls
+    into a later bucket the open one is sealed into the `<metric>@<tier>`
+    series of the metric store. After a restart the first bucket of a metric
+    may already have a row (sealed by flush() on shutdown); it is merged into
+    that row instead of being written a second time.
+    """
+
+    def __init__(self, store, tiers=DEFAULT_TIERS):
+        self.store = store
+        self.tiers = tuple(sorted(tiers, key=lambda tier: tier[1]))
+        self.open_buckets = {}
+
+    def add(self, ts, name, value):
+        """Fold one sample into every tier"""
+        for tier, width in self.tiers:
+            start = ts - ts % width
+            key = (name, tier)
+            bucket = self.open_buckets.get(key)
+            if bucket is None or bucket[0] != start:
+                persisted = None
+                if bucket is not None:
+                    self._seal(name, tier, bucket)
+                else:
+                    persisted = self._persisted(name, tier, start)
+                bucket = self.open_buckets[key] = [start, [], persisted]
+            bucket[1].append(value)
+
+    def _persisted(self, name, tier, start):
+        """Summary already stored for the bucket at `start`, if its row exists"""
+        row = self.store.series(tier_series_name(name, tier), ROLLUP_FIELDS).last()
+        if row is None or row['timestamp'] != start:
+            return None
+        return tuple(row[field] for field in ROLLUP_FIELDS)
+
+    def _seal(self, name, tier, bucket):
+        start, values, persisted = bucket
+        series = self.store.series(tier_series_name(name, tier), ROLLUP_FIELDS)
+        if persisted is None:
+            series.append(start, *summarize(values))
+        else:
+            series.replace_last(start, *merge_summaries(persisted, summarize(values)))
+
+    def flush(self):
+        """Seal every open bucket, e.g. on shutdown"""
+        for (name, tier), bucket in self.open_buckets.items():
+            if bucket[1]:
+                self._seal(name, tier, bucket)
+        self.open_buckets = {}
+
+    def _open_bucket(self, name, tier, start, end):
+        """Return the in-progress bucket as a single row, if inside the window"""
+        bucket = self.open_buckets.get((name, tier))
+        if not bucket or not bucket[1]:
+            return None
+        if (start is not None and bucket[0] < start) or (end is not None and bucket[0] > end):
+            return None
+        summary = summarize(bucket[1])
+        if bucket[2] is not None:
+            summary = merge_summaries(bucket[2], summary)
+        return (bucket[0],) + summary
+
+    def query(self, name, start, end, max_points=300):
+        """Return the finest resolution that fits the window in max_points.
+
+        The result holds 'tier' ('raw' or a tier name), 'timestamp', and one
+        list per rollup field; raw samples repeat the value in every field.
+        """
+        raw = self.store.series(name)
+        if raw.count(start, end) <= max_points or not self.tiers:
+            columns = raw.range(start, end)
+            values = columns['value']
+            return {
+                'tier': 'raw', 'timestamp': columns['timestamp'],
+                'min': values, 'max': values, 'avg': values, 'p95': values,
+                'count': [1] * len(values)
+            }
+
+        window = (end or 0) - (start or 0)
+        tier, width = self.tiers[-1]
+        for candidate, candidate_width in self.tiers:
+            if window / candidate_width <= max_points:
+                tier, width = candidate, candidate_width
+                break
+
+        # Widen the start so the bucket containing it is included
+        bucket_start = None if start is None else start - start % width
+        columns = self.store.series(tier_series_name(name, tier), ROLLUP_FIELDS).range(bucket_start, end)
+        current = self._open_bucket(name, tier, bucket_start, end)
+        if current is not None:
+            if columns['timestamp'] and columns['timestamp'][-1] == current[0]:
+                # The persisted partial row of a resumed bucket: show it merged
+                for field, value in zip(('timestamp',) + ROLLUP_FIELDS, current):
+                    columns[field][-1] = value
+            elif not columns['timestamp'] or columns['timestamp'][-1] < current[0]:
+                columns['timestamp'].append(current[0])
+                for field, value in zip(ROLLUP_FIELDS, current[1:]):
+                    columns[field].append(value)
+        columns['tier'] = tier
+        return columns
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from threading import Event, Lock
+
+OVERRUN_POLICIES = ('coalesce', 'skip', 'catch_up')
+
+class ScheduledTask:
+    def __init__(self, name, interval, callback, policy, first_deadline):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.policy = policy
+        self.deadline = first_deadline
+        self.runs = 0
+        self.overruns = 0
+        self.missed = 0
+        self.max_lateness = 0.0
+        self.last_duration = 0.0
+        self.timeout = None
+        self.triggered = 0
+        self.last_started = None
+        self.wakeup = None
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'missed': self.missed,
+            'triggered': self.triggered,
+            'max_lateness_s': round(self.max_lateness, 3),
+            'last_duration_s': round(self.last_duration, 3)
+        }
+
+class Scheduler:
+    """Fire tasks at fixed monotonic deadlines instead of sleeping between runs.
+
+    Deadlines stay on each task's start + k * interval grid, so run time never
+    accumulates as drift. Missed ticks are handled per task policy:
+    'coalesce' runs once and realigns, 'skip' drops the late tick entirely and
+    'catch_up' runs every missed tick back to back. trigger() pulls a task's
+    deadline forward, at most to `min_gap` seconds after its last start so a
+    burst of triggers merges into one run, and its grid restarts from there.
+    Deadlines are guarded by a lock because triggers come from other threads.
+    """
+
+    def __init__(self, policy='coalesce', clock=time.monotonic, sleep=None):
+        self.policy = policy if policy in OVERRUN_POLICIES else 'coalesce'
+        self.clock = clock
+        # Without a sleep function, waits end early when a task is triggered
+        self.sleep = sleep
+        self.wakeup = Event()
+        self.lock = Lock()
+        self.tasks = []
+        self.running = False
+
+    def add(self, name, interval, callback, policy=None):
+        """Register a task; it first fires immediately"""
+        task = ScheduledTask(name, interval, callback, policy or self.policy, self.clock())
+        self.tasks.append(task)
+        return task
+
+    def trigger(self, name, min_gap=0):
+        """Run a task early, but not within min_gap seconds of its last start; safe from any thread"""
+        with self.lock:
+            for task in self.tasks:
+                if task.name != name:
+                    continue
+                earliest = self.clock()
+                if task.last_started is not None:
+                    earliest = max(earliest, task.last_started + min_gap)
+                if earliest < task.deadline:
+                    # Triggers before this early run is due merge into it
+                    task.deadline = earliest
+                    task.triggered += 1
+                    self._wake(task)
+
+    def _wake(self, task):
+        self.wakeup.set()
+
+    def _advance(self, task, now):
+        """Move the deadline to the next grid point; return ticks missed"""
+        lateness = now - task.deadline
+        missed = int(lateness // task.interval) if lateness > 0 else 0
+        if task.policy == 'catch_up':
+            task.deadline += task.interval
+        else:
+            task.deadline += (missed + 1) * task.interval
+        return missed
+
+    def _claim(self, task, now):
+        """Advance a due task's deadline; return False if it is not due or this tick is skipped"""
+        with self.lock:
+            if now < task.deadline:
+                return False
+            task.max_lateness = max(task.max_lateness, now - task.deadline)
+            missed = self._advance(task, now)
+            if missed:
+                task.missed += missed
+                if task.policy == 'skip':
+                    return False
+            task.last_started = now
+            return True
+
+    def _until(self, task, now):
+        """Seconds until the task's deadline"""
+        with self.lock:
+            return task.deadline - now
+
+    def _finished(self, task, started):
+        task.runs += 1
+        task.last_duration = self.clock() - started
+        if task.last_duration > task.interval:
+            task.overruns += 1
+            print(f"Task '{task.name}' overran: {task.last_duration:.2f}s "
+                  f"(interval {task.interval:g}s)")
+
+    def run_pending(self):
+        """Run every task whose deadline has passed; return seconds until the next one"""
+        with self.lock:
+            order = sorted(self.tasks, key=lambda t: t.deadline)
+        for task in order:
+            if not self._claim(task, self.clock()):
+                continue
+
+            started = self.clock()
+            try:
+                task.callback()
+            finally:
+                self._finished(task, started)
+
+        if not self.tasks:
+            return None
+        now = self.clock()
+        return max(0.0, min(self._until(task, now) for task in self.tasks))
+
+    def run_forever(self):
+        """Run tasks at their deadlines until stop() is called"""
+        self.running = True
+        while self.running:
+            delay = self.run_pending()
+            if delay is None:
+                break
+            if delay > 0:
+                if self.sleep is not None:
+                    self.sleep(delay)
+                else:
+                    self.wakeup.wait(delay)
+                    self.wakeup.clear()
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {task.name: task.stats() for task in self.tasks}
+
+class AsyncScheduler(Scheduler):
+    """Scheduler whose tasks are coroutine functions, each on its own asyncio task.
+
+    A slow task only delays its own next tick; the others keep their cadence.
+    Each run is bounded by `timeout` seconds, or its own timeout if it was
+    added with one, and cancelled when it expires.
+    """
+
+    def __init__(self, policy='coalesce', timeout=None, clock=time.monotonic):
+        super().__init__(policy, clock)
+        self.timeout = timeout
+        self.timeouts = {}
+        self.loop = None
+
+    def add(self, name, interval, callback, policy=None, timeout=None):
+        """Register a task; `timeout` overrides the scheduler-wide timeout for it"""
+        task = super().add(name, interval, callback, policy)
+        task.timeout = self.timeout if timeout is None else timeout
+        return task
+
+    def _wake(self, task):
+        if self.loop is not None and task.wakeup is not None:
+            self.loop.call_soon_threadsafe(task.wakeup.set)
+
+    async def _run_task(self, task):
+        task.wakeup = asyncio.Event()
+        while self.running:
+            now = self.clock()
+            wait = self._until(task, now)
+            if wait > 0:
+                task.wakeup.clear()
+                try:
+                    await asyncio.wait_for(task.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if not self._claim(task, now):
+                continue
+
+            started = self.clock()
+            try:
+                await asyncio.wait_for(task.callback(), task.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts[task.name] = self.timeouts.get(task.name, 0) + 1
+                print(f"Task '{task.name}' timed out after {task.timeout:g}s and was cancelled")
+            finally:
+                self._finished(task, started)
+
+    async def run_forever(self):
+        """Run every task concurrently until stop() is called"""
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+        await asyncio.gather(*(self._run_task(task) for task in self.tasks))
@@ -1,50 +1,98 @@
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
-import json
-import os
+import time
+from collections import Counter
+from utils.log_reader import LogTailer
+from utils.records import ActionKind, AlertKind, AlertState, action_kind, alert_kind
+
+RESOURCE_METRICS = ('cpu', 'memory', 'disk')
+
+INCIDENT_CATEGORIES = {
+    AlertKind.SERVICE_DOWN: 'Service Down',
+    AlertKind.HIGH_CPU: 'High CPU',
+    AlertKind.HIGH_MEMORY: 'High Memory',
+    AlertKind.LOW_DISK: 'Low Disk',
+    AlertKind.LOW_INODES: 'Low Disk',
+    AlertKind.IO_LATENCY: 'I/O & Network',
+    AlertKind.IO_UTILIZATION: 'I/O & Network',
+    AlertKind.NETWORK_ERRORS: 'I/O & Network',
+    AlertKind.METRIC: 'Other'
+}
 
 class ChartGenerator:
-    def __init__(self, log_file='./logs/monitor.log'):
+    def __init__(self, log_file='./logs/monitor.log', history_size=500, metric_store=None,
+                 trend_window=86400, trend_max_points=300, incidents=None):
         self.log_file = log_file
+        self.tailer = LogTailer(log_file, maxlen=history_size)
+        self.metric_store = metric_store
+        self.incidents = incidents
+        self.trend_window = trend_window
+        self.trend_max_points = trend_max_points
+        self.figure_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def _cached_figure(self, name, key):
+        """Return the cached HTML for a chart if its input key is unchanged"""
+        cached = self.figure_cache.get(name)
+        if cached is not None and cached[0] == key:
+            self.cache_hits += 1
+            return True, cached[1]
+        self.cache_misses += 1
+        return False, None
+    
+    def _store_figure(self, name, key, html):
+        self.figure_cache[name] = (key, html)
+        return html
     
     def read_logs(self, limit=100):
         """Read recent logs from the log file"""
-        logs = []
-        if os.path.exists(self.log_file):
-            with open(self.log_file, 'r') as f:
-                for line in f:
-                    try:
-                        logs.append(json.loads(line.strip()))
-                    except:
-                        continue
-        return logs[-limit:] if logs else []
+        self.tailer.poll()
+        return self.tailer.read(limit)
     
-    def create_resource_chart(self):
-        """Create chart showing CPU, RAM, Disk usage over time"""
-        logs = self.read_logs(50)  # Last 50 readings
-        if not logs:
-            return None
-        
-        metrics_logs = [log for log in logs if log.get('type') == 'metrics']
-        
-        if len(metrics_logs) < 2:
-            return None
+    def read_events(self, event_type, limit=100):
+        """Read recent logs of one event type"""
+        self.tailer.poll()
+        return self.tailer.events(event_type, limit)
+    
+    def read_resource_history(self, limit):
+        """Return (timestamps, cpu, memory, disk) for the last `limit` readings"""
+        if self.metric_store is not None:
+            columns = [self.metric_store.tail(name, limit) for name in RESOURCE_METRICS]
+            count = min(len(column['timestamp']) for column in columns)
+            timestamps = [
+                datetime.fromtimestamp(ts).strftime("%H:%M:%S")
+                for ts in columns[0]['timestamp'][-count:]
+            ] if count else []
+            values = [column['value'][-count:] if count else [] for column in columns]
+            return timestamps, values[0], values[1], values[2]
         
         timestamps = []
         cpu_values = []
         memory_values = []
         disk_values = []
         
-        for log in metrics_logs:
+        for log in self.read_events('metrics', limit):
             data = log.get('data', {})
             if 'cpu' in data and 'memory' in data and 'disk' in data:
-                timestamps.append(log.get('timestamp', ''))
+                try:
+                    dt = datetime.fromisoformat(log.get('timestamp', ''))
+                    timestamps.append(dt.strftime("%H:%M:%S"))
+                except:
+                    timestamps.append(log.get('timestamp', ''))
                 cpu_values.append(data['cpu'])
                 memory_values.append(data['memory'])
                 disk_values.append(data['disk'])
         
-        if not timestamps:
+        return timestamps, cpu_values, memory_values, disk_values
+    
+    def create_resource_chart(self):
+        """Create chart showing CPU, RAM, Disk usage over time"""
+        # Last 50 readings
+        display_timestamps, cpu_values, memory_values, disk_values = self.read_resource_history(50)
+        
+        if len(display_timestamps) < 2:
             return None
         
         fig = make_subplots(
@@ -55,14 +103,6 @@ class ChartGenerator:
             horizontal_spacing=0.15
         )
         
-        display_timestamps = []
-        for ts in timestamps:
-            try:
-                dt = datetime.fromisoformat(ts)
-                display_timestamps.append(dt.strftime("%H:%M:%S"))
-            except:
-                display_timestamps.append(ts)
-        
         fig.add_trace(
             go.Scatter(
                 x=display_timestamps,
@@ -102,7 +142,11 @@ class ChartGenerator:
             row=2, col=1
         )
         
-        latest_metrics = metrics_logs[-1]['data']
+        latest_metrics = {
+            'cpu': cpu_values[-1],
+            'memory': memory_values[-1],
+            'disk': disk_values[-1]
+        }
         
         fig.add_trace(
             go.Indicator(
@@ -238,34 +282,16 @@ class ChartGenerator:
     
     def create_simple_resource_chart(self):
         """Simpler version: Separate charts for each resource"""
-        logs = self.read_logs(30)  # Last 30 readings
-        if not logs:
-            return None
-        
-        metrics_logs = [log for log in logs if log.get('type') == 'metrics']
+        # Last 30 readings
+        timestamps, cpu_values, memory_values, disk_values = self.read_resource_history(30)
         
-        if len(metrics_logs) < 2:
+        if len(timestamps) < 2:
             return None
         
-        timestamps = []
-        cpu_values = []
-        memory_values = []
-        disk_values = []
-        
-        for log in metrics_logs:
-            data = log.get('data', {})
-            if 'cpu' in data and 'memory' in data and 'disk' in data:
-                try:
-                    dt = datetime.fromisoformat(log.get('timestamp', ''))
-                    timestamps.append(dt.strftime("%H:%M:%S"))
-                except:
-                    timestamps.append(log.get('timestamp', ''))
-                cpu_values.append(data['cpu'])
-                memory_values.append(data['memory'])
-                disk_values.append(data['disk'])
-        
-        if not timestamps:
-            return None
+        key = (timestamps, cpu_values, memory_values, disk_values)
+        hit, html = self._cached_figure('resource_chart', key)
+        if hit:
+            return html
         
         fig = go.Figure()
         
@@ -323,40 +349,136 @@ class ChartGenerator:
         fig.update_xaxes(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
         fig.update_yaxes(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
         
-        return fig.to_html(full_html=False, include_plotlyjs='cdn')
+        html = fig.to_html(full_html=False, include_plotlyjs='cdn', div_id='resource-chart')
+        return self._store_figure('resource_chart', key, html)
+    
+    def create_trend_chart(self, window=None):
+        """Create long-range resource trends from the best-fitting rollup tier"""
+        if self.metric_store is None:
+            return None
+        
+        window = window or self.trend_window
+        end = time.time()
+        start = end - window
+        
+        colors = {'cpu': '#ef4444', 'memory': '#10b981', 'disk': '#3b82f6'}
+        labels = {'cpu': 'CPU %', 'memory': 'Memory %', 'disk': 'Disk %'}
+        
+        series = []
+        for name in RESOURCE_METRICS:
+            columns = self.metric_store.query_window(name, start, end, self.trend_max_points)
+            if len(columns['timestamp']) >= 2:
+                series.append((name, columns))
+        
+        if not series:
+            return None
+        
+        key = (window, [(name, columns['tier'], columns['timestamp'], columns['avg'], columns.get('max'))
+                        for name, columns in series])
+        hit, html = self._cached_figure('trend_chart', key)
+        if hit:
+            return html
+        
+        fig = go.Figure()
+        tier = None
+        for name, columns in series:
+            tier = columns['tier']
+            timestamps = [datetime.fromtimestamp(ts) for ts in columns['timestamp']]
+            
+            fig.add_trace(go.Scatter(
+                x=timestamps,
+                y=columns['avg'],
+                name=labels[name],
+                line=dict(color=colors[name], width=2),
+                mode='lines'
+            ))
+            if tier != 'raw':
+                fig.add_trace(go.Scatter(
+                    x=timestamps,
+                    y=columns['max'],
+                    name=f"{labels[name]} max",
+                    line=dict(color=colors[name], width=1, dash='dot'),
+                    mode='lines'
+                ))
+        
+        hours = window / 3600
+        fig.update_layout(
+            title=f'Resource Trends (last {hours:g}h, {tier} resolution)',
+            xaxis_title='Time',
+            yaxis_title='Usage %',
+            height=400,
+            plot_bgcolor='#1e293b',
+            paper_bgcolor='#0f172a',
+            font=dict(family='Inter, sans-serif', color='#f1f5f9', size=12),
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1,
+                bgcolor="#1e293b",
+                bordercolor="#334155",
+                borderwidth=1
+            )
+        )
+        
+        fig.update_yaxes(range=[0, 100])
+        fig.update_xaxes(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
+        fig.update_yaxes(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
+        
+        html = fig.to_html(full_html=False, include_plotlyjs=False)
+        return self._store_figure('trend_chart', key, html)
+    
+    def read_incident_counts(self):
+        """Return ({AlertKind: count}, cache key) from the aggregator or the recent log"""
+        if self.incidents is not None:
+            return self.incidents.incident_counts(), ('incidents', self.incidents.version)
+        logs = self.read_events('alerts', 100)
+        counts = Counter(
+            alert_kind(alert) for log in logs for alert in log.get('data', [])
+            if not isinstance(alert, dict) or alert.get('state', AlertState.FIRING.value) == AlertState.FIRING.value
+        )
+        return counts, self.tailer.version('alerts')
+    
+    def read_healing_totals(self):
+        """Return ((successful, failed), cache key) from the aggregator or the recent log"""
+        if self.incidents is not None:
+            return self.incidents.healing_totals(), ('incidents', self.incidents.version)
+        success_count = failed_count = 0
+        for log in self.read_events('healing', 100):
+            for action in log.get('data', []):
+                if isinstance(action, dict) and action_kind(action) != ActionKind.SKIP_RESTART:
+                    if action.get('success', False):
+                        success_count += 1
+                    else:
+                        failed_count += 1
+        return (success_count, failed_count), self.tailer.version('healing')
     
     def create_incidents_chart(self):
         """Create chart showing incidents by type"""
-        logs = self.read_logs(100)
-        if not logs:
+        kind_counts, key = self.read_incident_counts()
+        if not kind_counts:
             return None
         
-        alert_counts = {'Service Down': 0, 'High CPU': 0, 'High Memory': 0, 'Low Disk': 0}
-        
-        for log in logs:
-            if log.get('type') == 'alerts':
-                alerts = log.get('data', [])
-                for alert in alerts:
-                    alert_str = str(alert).lower()
-                    if 'service down' in alert_str or 'stopped' in alert_str:
-                        alert_counts['Service Down'] += 1
-                    elif 'cpu' in alert_str:
-                        alert_counts['High CPU'] += 1
-                    elif 'memory' in alert_str:
-                        alert_counts['High Memory'] += 1
-                    elif 'disk' in alert_str:
-                        alert_counts['Low Disk'] += 1
+        # The chart only depends on the counts: skip it while unchanged
+        hit, html = self._cached_figure('incidents_chart', key)
+        if hit:
+            return html
+        
+        alert_counts = {category: 0 for category in INCIDENT_CATEGORIES.values()}
+        for kind, count in kind_counts.items():
+            alert_counts[INCIDENT_CATEGORIES[kind]] += count
         
         alert_counts = {k: v for k, v in alert_counts.items() if v > 0}
         
         if not alert_counts:
-            return None
+            return self._store_figure('incidents_chart', key, None)
         
         fig = go.Figure(data=[
             go.Bar(
                 x=list(alert_counts.keys()),
                 y=list(alert_counts.values()),
-                marker_color=['#ef4444', '#f59e0b', '#10b981', '#3b82f6'][:len(alert_counts)],
+                marker_color=['#ef4444', '#f59e0b', '#10b981', '#3b82f6', '#a855f7', '#64748b'][:len(alert_counts)],
                 text=list(alert_counts.values()),
                 textposition='auto',
                 textfont={'color': '#f1f5f9'}
@@ -375,40 +497,18 @@ class ChartGenerator:
             yaxis=dict(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
         )
         
-        return fig.to_html(full_html=False, include_plotlyjs=False)
+        html = fig.to_html(full_html=False, include_plotlyjs=False)
+        return self._store_figure('incidents_chart', key, html)
     
     def create_actions_chart(self):
         """Create chart showing healing actions"""
-        logs = self.read_logs(100)
-        if not logs:
-            return None
-        
-        actions_data = []
-        for log in logs:
-            if log.get('type') == 'healing':
-                actions = log.get('data', [])
-                for action in actions:
-                    if isinstance(action, dict):
-                        message = action.get('message', '')
-                        success = action.get('success', False)
-                        if 'restart' in message.lower():
-                            action_type = 'Service Restart'
-                        elif 'clean' in message.lower():
-                            action_type = 'Cleanup'
-                        else:
-                            action_type = 'Other'
-                        
-                        actions_data.append({
-                            'type': action_type,
-                            'success': success,
-                            'timestamp': log.get('timestamp', '')
-                        })
-        
-        if not actions_data:
+        (success_count, failed_count), key = self.read_healing_totals()
+        if not success_count and not failed_count:
             return None
         
-        success_count = sum(1 for action in actions_data if action['success'])
-        failed_count = sum(1 for action in actions_data if not action['success'])
+        hit, html = self._cached_figure('actions_chart', key)
+        if hit:
+            return html
         
         fig = go.Figure(data=[
             go.Pie(
@@ -436,10 +536,16 @@ class ChartGenerator:
             )
         )
         
-        return fig.to_html(full_html=False, include_plotlyjs=False)
+        html = fig.to_html(full_html=False, include_plotlyjs=False)
+        return self._store_figure('actions_chart', key, html)
     
     def create_current_metrics_chart(self, current_metrics):
         """Create gauge chart for current metrics"""
+        key = tuple(current_metrics.get(name, 0) for name in RESOURCE_METRICS)
+        hit, html = self._cached_figure('current_metrics', key)
+        if hit:
+            return html
+        
         fig = make_subplots(
             rows=1, cols=3,
             subplot_titles=('CPU', 'Memory', 'Disk'),
@@ -515,15 +621,97 @@ class ChartGenerator:
             plot_bgcolor='#1e293b'
         )
         
-        return fig.to_html(full_html=False, include_plotlyjs=False)
+        html = fig.to_html(full_html=False, include_plotlyjs=False, div_id='current-metrics-chart')
+        return self._store_figure('current_metrics', key, html)
+    
+    def create_io_chart(self, metrics):
+        """Create bar charts of current per-disk and per-interface throughput"""
+        disks = metrics.get('disk_io') or {}
+        nics = metrics.get('network') or {}
+        if not disks and not nics:
+            return None
+        
+        key = (sorted((name, tuple(sorted(rates.items()))) for name, rates in disks.items()),
+               sorted((name, tuple(sorted(rates.items()))) for name, rates in nics.items()))
+        hit, html = self._cached_figure('io_chart', key)
+        if hit:
+            return html
+        
+        mb = 1024 * 1024
+        fig = make_subplots(rows=1, cols=2, subplot_titles=('Disk I/O (MB/s)', 'Network (MB/s)'))
+        disk_names = sorted(disks)
+        nic_names = sorted(nics)
+        fig.add_trace(go.Bar(x=disk_names, y=[disks[d]['read_bytes_per_s'] / mb for d in disk_names],
+                             name='Read', marker_color='#3b82f6',
+                             customdata=[disks[d]['latency_ms'] for d in disk_names],
+                             hovertemplate='%{y:.2f} MB/s, %{customdata} ms/op'), row=1, col=1)
+        fig.add_trace(go.Bar(x=disk_names, y=[disks[d]['write_bytes_per_s'] / mb for d in disk_names],
+                             name='Write', marker_color='#f59e0b',
+                             customdata=[disks[d]['latency_ms'] for d in disk_names],
+                             hovertemplate='%{y:.2f} MB/s, %{customdata} ms/op'), row=1, col=1)
+        fig.add_trace(go.Bar(x=nic_names, y=[nics[n]['rx_bytes_per_s'] / mb for n in nic_names],
+                             name='Received', marker_color='#10b981'), row=1, col=2)
+        fig.add_trace(go.Bar(x=nic_names, y=[nics[n]['tx_bytes_per_s'] / mb for n in nic_names],
+                             name='Sent', marker_color='#ef4444'), row=1, col=2)
+        
+        fig.update_layout(
+            barmode='group',
+            height=350,
+            paper_bgcolor='#0f172a',
+            font=dict(family='Inter, sans-serif', color='#f1f5f9', size=12),
+            plot_bgcolor='#1e293b'
+        )
+        fig.update_xaxes(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
+        fig.update_yaxes(showgrid=True, gridcolor='#334155', zerolinecolor='#334155')
+        
+        html = fig.to_html(full_html=False, include_plotlyjs=False)
+        return self._store_figure('io_chart', key, html)
+    
+    def create_processes_table(self, metrics):
+        """Create a table of the busiest processes by CPU"""
+        processes = metrics.get('processes') or {}
+        rows = processes.get('top_cpu')
+        if not rows:
+            return None
+        
+        key = tuple((row['pid'], row['cpu_percent'], row['rss'], row['io_bytes_per_s']) for row in rows)
+        hit, html = self._cached_figure('processes_table', key)
+        if hit:
+            return html
+        
+        fig = go.Figure(data=[go.Table(
+            header=dict(values=['PID', 'Name', 'CPU %', 'RSS (MB)', 'I/O (KB/s)'],
+                        fill_color='#1e293b', font=dict(color='#f1f5f9'), align='left'),
+            cells=dict(values=[
+                [row['pid'] for row in rows],
+                [row['name'] for row in rows],
+                [row['cpu_percent'] for row in rows],
+                [round(row['rss'] / (1024 * 1024), 1) for row in rows],
+                [round(row['io_bytes_per_s'] / 1024, 1) for row in rows]
+            ], fill_color='#0f172a', font=dict(color='#f1f5f9'), align='left')
+        )])
+        
+        fig.update_layout(
+            height=300,
+            margin=dict(l=10, r=10, t=10, b=10),
+            paper_bgcolor='#0f172a',
+            font=dict(family='Inter, sans-serif', color='#f1f5f9', size=12)
+        )
+        
+        html = fig.to_html(full_html=False, include_plotlyjs=False)
+        return self._store_figure('processes_table', key, html)
     
     def generate_all_charts(self, metrics, services_status):
         """Generate all charts and return HTML"""
+        self.tailer.poll()
         charts_html = {
             'resource_chart': self.create_simple_resource_chart(),
+            'trend_chart': self.create_trend_chart(),
             'current_metrics': self.create_current_metrics_chart(metrics),
             'incidents_chart': self.create_incidents_chart(),
-            'actions_chart': self.create_actions_chart()
+            'actions_chart': self.create_actions_chart(),
+            'io_chart': self.create_io_chart(metrics),
+            'processes_table': self.create_processes_table(metrics)
         }
         
         return charts_html
\ No newline at end of file
@@ -1,15 +1,227 @@
-import os
+import json
+import time
 from datetime import datetime
-from http.server import HTTPServer, SimpleHTTPRequestHandler
 from threading import Thread
+from utils.event_index import LogIndex
+from utils.records import HealingAction
 from visualization.chart_generator import ChartGenerator
+from visualization.event_bus import EventBroadcaster
+from visualization.history import CycleHistory
+from visualization.page_cache import PageCache
+from visualization.render_worker import RenderWorker
+from visualization.server import DashboardHTTPServer, DashboardRequestHandler
+
+RELOAD_SCRIPT = """
+                // Auto-refresh every 13 seconds
+                setTimeout(function() {
+                    location.reload();
+                }, 13000);
+"""
+
+# Listens on the SSE stream (or polls the JSON API for deltas) and extends the
+# existing figures in place; the full page is only reloaded every few minutes
+# for the slow-moving charts
+INCREMENTAL_SCRIPT = """
+                (function() {
+                    var since = __SINCE__;
+                    var pollMs = __POLL_MS__;
+                    var maxPoints = 30;
+                    var thresholds = __THRESHOLDS__;
+                    var names = ['cpu', 'memory', 'disk'];
+
+                    function level(name, value) {
+                        var t = thresholds[name];
+                        if (value < t[0]) return ['Good', '#10b981'];
+                        if (value < t[1]) return ['Warning', '#f59e0b'];
+                        return ['Critical', '#ef4444'];
+                    }
+
+                    function formatTime(ts) {
+                        return new Date(ts * 1000).toTimeString().slice(0, 8);
+                    }
+
+                    function escapeHtml(text) {
+                        var div = document.createElement('div');
+                        div.textContent = String(text);
+                        return div.innerHTML;
+                    }
+
+                    function updateCards(data) {
+                        var last = data.timestamp.length - 1;
+                        var gauges = document.getElementById('current-metrics-chart');
+                        names.forEach(function(name, i) {
+                            var value = data[name][last];
+                            var state = level(name, value);
+                            var valueEl = document.getElementById(name + '-value');
+                            var statusEl = document.getElementById(name + '-status');
+                            if (valueEl) {
+                                valueEl.textContent = value.toFixed(1) + '%';
+                                valueEl.style.color = state[1];
+                            }
+                            if (statusEl) {
+                                statusEl.textContent = state[0];
+                                statusEl.style.background = state[1];
+                            }
+                            if (gauges && window.Plotly) {
+                                Plotly.restyle(gauges, {value: [value]}, [i]);
+                            }
+                        });
+                        var updated = document.getElementById('last-update');
+                        if (updated) {
+                            updated.textContent = 'Last update: ' + new Date(data.timestamp[last] * 1000).toLocaleString();
+                        }
+                    }
+
+                    function updateAlerts(data) {
+                        var list = document.getElementById('alerts-list');
+                        if (!list) return;
+                        if (!data.active.length) {
+                            list.innerHTML = '<div class="ok-item">✅ All systems normal</div>';
+                            return;
+                        }
+                        list.innerHTML = data.active.map(function(alert) {
+                            var text = typeof alert === 'string' ? alert : alert.message;
+                            return '<div class="alert-item">' + escapeHtml(text) + '</div>';
+                        }).join('');
+                    }
+
+                    function poll() {
+                        fetch('/api/metrics?since=' + since, {cache: 'no-store'})
+                            .then(function(response) { return response.json(); })
+                            .then(function(data) {
+                                if (!data.timestamp.length) return null;
+                                applyMetrics(data);
+                                return fetch('/api/alerts?limit=1', {cache: 'no-store'})
+                                    .then(function(response) { return response.json(); })
+                                    .then(updateAlerts);
+                            })
+                            .catch(function() {})
+                            .then(function() { setTimeout(poll, pollMs); });
+                    }
+
+                    function applyMetrics(data) {
+                        since = data.timestamp[data.timestamp.length - 1];
+                        var chart = document.getElementById('resource-chart');
+                        if (chart && window.Plotly && chart.data) {
+                            var x = data.timestamp.map(formatTime);
+                            Plotly.extendTraces(chart, {
+                                x: [x, x, x],
+                                y: [data.cpu, data.memory, data.disk]
+                            }, [0, 1, 2], maxPoints);
+                        }
+                        updateCards(data);
+                    }
+
+                    function startPolling() {
+                        setTimeout(poll, pollMs);
+                    }
+
+                    // Prefer the push channel; fall back to polling if it fails
+                    if (window.EventSource) {
+                        var stream = new EventSource('/api/stream');
+                        var opened = false;
+                        stream.onopen = function() { opened = true; };
+                        stream.addEventListener('cycle', function(event) {
+                            var cycle = JSON.parse(event.data);
+                            if (cycle.timestamp > since) {
+                                applyMetrics({
+                                    timestamp: [cycle.timestamp],
+                                    cpu: [cycle.metrics.cpu],
+                                    memory: [cycle.metrics.memory],
+                                    disk: [cycle.metrics.disk]
+                                });
+                            }
+                            updateAlerts({active: cycle.alerts});
+                        });
+                        stream.onerror = function() {
+                            if (!opened) {
+                                stream.close();
+                                startPolling();
+                            }
+                        };
+                    } else {
+                        startPolling();
+                    }
+                    setTimeout(function() { location.reload(); }, __FULL_REFRESH_MS__);
+                })();
+"""
 
 class Dashboard:
-    def __init__(self, port=8080):
+    def __init__(self, port=8080, log_file='./logs/monitor.log', metric_store=None, trend_window=86400,
+                 max_connections=256, keepalive_timeout=15, refresh_mode='reload',
+                 poll_interval=5, full_refresh_interval=600, incidents=None, thresholds=None):
         self.port = port
+        # Card colours: warning from the alert threshold, critical halfway to 100%
+        # as alert severity does
+        thresholds = thresholds or {'cpu': 80, 'memory': 85, 'disk': 90}
+        self.levels = {name: [value, (value + 100) / 2] for name, value in thresholds.items()}
+        self.refresh_mode = refresh_mode
+        self.poll_interval = poll_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.history = CycleHistory(metric_store=metric_store)
+        self.event_index = LogIndex(log_file)
+        self.incidents = incidents
+        # Extra sections of /api/server-stats: name -> callable returning a dict
+        self.status_sources = {'event_index': self.event_index.stats,
+                               'page_cache': lambda: {'renders': self.page_cache.renders}}
+        self.broadcaster = EventBroadcaster()
+        self.renderer = RenderWorker(self.generate_dashboard)
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.server = None
         self.server_thread = None
-        self.chart_generator = ChartGenerator()
+        self.page_cache = PageCache()
+        self.chart_generator = ChartGenerator(log_file, metric_store=metric_store, trend_window=trend_window,
+                                              incidents=incidents)
     
+    def record_cycle(self, ts, metrics, alerts, healing_actions, active_alerts=None):
+        """Record a completed cycle for the JSON API and push it to live viewers.
+
+        `alerts` are the cycle's alert transitions; `active_alerts` the alerts
+        firing after it (the same list when alerts are not tracked).
+        """
+        active_alerts = alerts if active_alerts is None else active_alerts
+        self.history.record(ts, metrics, alerts, healing_actions, active_alerts)
+        self.broadcaster.publish('cycle', {
+            'timestamp': ts,
+            'metrics': {name: metrics.get(name) for name in ('cpu', 'memory', 'disk')},
+            'alerts': active_alerts,
+            'transitions': alerts,
+            'actions': healing_actions
+        })
+
+    def submit_dashboard(self, metrics, alerts, healing_actions):
+        """Render the dashboard on the background renderer without blocking"""
+        self.renderer.start()
+        self.renderer.submit(metrics, alerts, healing_actions)
+
+    def stop(self):
+        self.renderer.stop(timeout=10)
+        self.broadcaster.close()
+
+    def _refresh_script(self):
+        if self.refresh_mode != 'incremental':
+            return RELOAD_SCRIPT
+        since = self.history.latest['timestamp'] or time.time()
+        return (INCREMENTAL_SCRIPT
+                .replace('__SINCE__', repr(since))
+                .replace('__THRESHOLDS__', json.dumps(self.levels))
+                .replace('__POLL_MS__', str(int(self.poll_interval * 1000)))
+                .replace('__FULL_REFRESH_MS__', str(int(self.full_refresh_interval * 1000))))
+
+    def _level(self, name, value):
+        """Return (status, colour) of a resource card"""
+        warning, critical = self.levels[name]
+        if value < warning:
+            return "Good", "#10b981"
+        if value < critical:
+            return "Warning", "#f59e0b"
+        return "Critical", "#ef4444"
+
+    def render_on_request(self, metrics, alerts, healing_actions):
+        """Render the page from this cycle's data only when it is next requested"""
+        self.page_cache.invalidate('/', lambda: self.render_page(metrics, alerts, healing_actions))
+
     def _format_alerts(self, alerts):
         if not alerts:
             return '<div class="ok-item">✅ All systems normal</div>'
@@ -25,10 +237,12 @@ class Dashboard:
         
         html = ''
         for action in actions:
+            if isinstance(action, HealingAction):
+                action = action.to_dict()
             if isinstance(action, dict):
                 success = action.get('success')
                 message = action.get('message', '')
-                service = action.get('service', 'Unknown')
+                service = action.get('service') or action.get('target', 'Unknown')
                 
                 if success is True:
                     color_class = "success-action"
@@ -95,21 +309,27 @@ class Dashboard:
         return html
 
     def generate_dashboard(self, metrics, alerts, healing_actions):
-        """Generate HTML dashboard with charts"""
+        """Generate HTML dashboard with charts and publish it"""
+        html = self.render_page(metrics, alerts, healing_actions)
+        self.page_cache.publish('/', html)
+        return html
+
+    def render_page(self, metrics, alerts, healing_actions):
+        """Return the dashboard HTML for one cycle's data"""
         
         charts_html = self.chart_generator.generate_all_charts(metrics, {})
         
-        cpu_status = "Good" if metrics['cpu'] < 80 else "Warning" if metrics['cpu'] < 90 else "Critical"
-        cpu_color = "#10b981" if metrics['cpu'] < 80 else "#f59e0b" if metrics['cpu'] < 90 else "#ef4444"
-        
-        mem_status = "Good" if metrics['memory'] < 85 else "Warning" if metrics['memory'] < 95 else "Critical"
-        mem_color = "#10b981" if metrics['memory'] < 85 else "#f59e0b" if metrics['memory'] < 95 else "#ef4444"
-        
-        disk_status = "Good" if metrics['disk'] < 90 else "Warning" if metrics['disk'] < 95 else "Critical"
-        disk_color = "#10b981" if metrics['disk'] < 90 else "#f59e0b" if metrics['disk'] < 95 else "#ef4444"
+        cpu_status, cpu_color = self._level('cpu', metrics['cpu'])
+        mem_status, mem_color = self._level('memory', metrics['memory'])
+        disk_status, disk_color = self._level('disk', metrics['disk'])
         
         current_time = datetime.now()
         
+        if self.refresh_mode == 'incremental':
+            footer_note = f"Live updates every cycle • Full refresh every {self.full_refresh_interval // 60:g} minutes"
+        else:
+            footer_note = "Auto-refreshes every 13 seconds • Charts update automatically"
+        
         html = f"""
         <!DOCTYPE html>
         <html>
@@ -411,36 +631,36 @@ class Dashboard:
                 <div class="header">
                     <h1>🔍 System Monitor Dashboard</h1>
                     <p>Real-time monitoring, auto-healing, and analytics</p>
-                    <div class="timestamp">Last update: {current_time.strftime("%Y-%m-%d %H:%M:%S")}</div>
+                    <div class="timestamp" id="last-update">Last update: {current_time.strftime("%Y-%m-%d %H:%M:%S")}</div>
                 </div>
                 
                 <div class="metrics">
                     <div class="metric-card">
                         <div class="metric-label">CPU Usage</div>
-                        <div class="metric-value" style="color: {cpu_color}">
+                        <div class="metric-value" id="cpu-value" style="color: {cpu_color}">
                             {metrics['cpu']:.1f}%
                         </div>
-                        <span class="status" style="background: {cpu_color}">
+                        <span class="status" id="cpu-status" style="background: {cpu_color}">
                             {cpu_status}
                         </span>
                     </div>
                     
                     <div class="metric-card">
                         <div class="metric-label">Memory Usage</div>
-                        <div class="metric-value" style="color: {mem_color}">
+                        <div class="metric-value" id="memory-value" style="color: {mem_color}">
                             {metrics['memory']:.1f}%
                         </div>
-                        <span class="status" style="background: {mem_color}">
+                        <span class="status" id="memory-status" style="background: {mem_color}">
                             {mem_status}
                         </span>
                     </div>
                     
                     <div class="metric-card">
                         <div class="metric-label">Disk Usage</div>
-                        <div class="metric-value" style="color: {disk_color}">
+                        <div class="metric-value" id="disk-value" style="color: {disk_color}">
                             {metrics['disk']:.1f}%
                         </div>
-                        <span class="status" style="background: {disk_color}">
+                        <span class="status" id="disk-status" style="background: {disk_color}">
                             {disk_status}
                         </span>
                     </div>
@@ -465,16 +685,31 @@ class Dashboard:
                     </div>
                 </div>
                 
+                <div class="chart-container">
+                    <div class="chart-title">📉 Long-Range Resource Trends</div>
+                    {charts_html.get('trend_chart') or '<p style="text-align: center; color: var(--text-secondary);">Collecting data...</p>'}
+                </div>
+                
                 <div class="small-charts-grid">
                     <div class="chart-container">
                         <div class="chart-title">🚨 Incidents by Type</div>
                         {charts_html.get('incidents_chart', '<p style="text-align: center; color: var(--text-secondary);">No incidents recorded</p>')}
                     </div>
+                    
+                    <div class="chart-container">
+                        <div class="chart-title">💾 Disk & Network I/O</div>
+                        {charts_html.get('io_chart') or '<p style="text-align: center; color: var(--text-secondary);">Collecting data...</p>'}
+                    </div>
+                    
+                    <div class="chart-container">
+                        <div class="chart-title">🔥 Top Processes by CPU</div>
+                        {charts_html.get('processes_table') or '<p style="text-align: center; color: var(--text-secondary);">Collecting data...</p>'}
+                    </div>
                 </div>
                 
                 <div class="alerts">
                     <h2>🚨 Active Alerts</h2>
-                    {self._format_alerts(alerts)}
+                    <div id="alerts-list">{self._format_alerts(alerts)}</div>
                 </div>
                 
                 <div class="actions">
@@ -483,38 +718,33 @@ class Dashboard:
                 </div>
                 
                 <button class="refresh-btn" onclick="location.reload()">🔄 Refresh Dashboard</button>
-                <p class="footer-note">Auto-refreshes every 13 seconds • Charts update automatically</p>
+                <p class="footer-note">{footer_note}</p>
             </div>
             
-            <script>
-                // Auto-refresh every 13 seconds
-                setTimeout(function() {{
-                    location.reload();
-                }}, 13000);
-            </script>
+            <script>{self._refresh_script()}</script>
         </body>
         </html>
         """
         
-        with open('dashboard.html', 'w', encoding='utf-8') as f:
-            f.write(html)
-        
         return html
 
     def run_server(self):
         """Run dashboard server"""
-        os.chdir('.')
-        
-        class DashboardHandler(SimpleHTTPRequestHandler):
-            def do_GET(self):
-                if self.path == '/':
-                    self.path = '/dashboard.html'
-                return SimpleHTTPRequestHandler.do_GET(self)
+        class DashboardHandler(DashboardRequestHandler):
+            page_cache = self.page_cache
+            history = self.history
+            broadcaster = self.broadcaster
+            renderer = self.renderer
+            event_index = self.event_index
+            incidents = self.incidents
+            status_sources = self.status_sources
+            timeout = self.keepalive_timeout
         
-        server = HTTPServer(('0.0.0.0', self.port), DashboardHandler)
+        self.server = DashboardHTTPServer(('0.0.0.0', self.port), DashboardHandler,
+                                          max_connections=self.max_connections)
         print(f"Dashboard available at: http://localhost:{self.port}")
         print("   Press Ctrl+C to stop")
-        server.serve_forever()
+        self.server.serve_forever()
     
     def start_in_background(self):
         """Start dashboard in background thread"""
@@ -0,0 +1,86 @@
+import json
+from collections import deque
+from threading import Condition, Lock
+from utils.records import json_default
+
+class Subscription:
+    """Bounded per-client frame buffer; the oldest frames are dropped when full"""
+
+    def __init__(self, maxlen):
+        self.frames = deque(maxlen=maxlen)
+        self.condition = Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, frame):
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Return the next frame, or None on timeout or close"""
+        with self.condition:
+            if not self.frames and not self.closed:
+                self.condition.wait(timeout)
+            if self.frames:
+                return self.frames.popleft()
+            return None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class EventBroadcaster:
+    """Fan out Server-Sent Events frames to every subscribed client.
+
+    Each event is serialized once on publish; slow clients only ever hold
+    `client_buffer` frames, so one stalled browser cannot grow memory or
+    delay the others.
+    """
+
+    def __init__(self, client_buffer=16):
+        self.client_buffer = client_buffer
+        self.lock = Lock()
+        self.subscribers = set()
+        self.sequence = 0
+        self.last_frame = None
+
+    def subscribe(self):
+        subscription = Subscription(self.client_buffer)
+        with self.lock:
+            self.subscribers.add(subscription)
+            last_frame = self.last_frame
+        if last_frame is not None:
+            # New viewers start from the latest state instead of waiting a cycle
+            subscription.offer(last_frame)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+        subscription.close()
+
+    def publish(self, event, payload):
+        """Serialize one event and queue it for every subscriber"""
+        with self.lock:
+            self.sequence += 1
+            data = json.dumps(payload, default=json_default)
+            frame = f"id: {self.sequence}\nevent: {event}\ndata: {data}\n\n".encode('utf-8')
+            self.last_frame = frame
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.offer(frame)
+
+    def client_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    def close(self):
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
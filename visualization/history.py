@@ -0,0 +1,73 @@
+from collections import deque
+from threading import Lock
+
+RESOURCE_METRICS = ('cpu', 'memory', 'disk')
+
+class CycleHistory:
+    """Bounded in-process history of monitoring cycles for the JSON API.
+
+    The monitoring loop records every cycle; server threads read deltas with
+    the `*_since` methods. Metrics come from the metric store when one is
+    configured, so history survives restarts.
+    """
+
+    def __init__(self, maxlen=2000, metric_store=None):
+        self.lock = Lock()
+        self.metric_store = metric_store
+        self.metrics = deque(maxlen=maxlen)
+        self.alerts = deque(maxlen=maxlen)
+        self.actions = deque(maxlen=maxlen)
+        self.latest = {'timestamp': None, 'alerts': [], 'actions': []}
+
+    def record(self, ts, metrics, alerts, actions, active_alerts=None):
+        """Record one completed monitoring cycle"""
+        active_alerts = alerts if active_alerts is None else active_alerts
+        sample = {'timestamp': ts}
+        for name in RESOURCE_METRICS:
+            sample[name] = metrics.get(name)
+        with self.lock:
+            self.metrics.append(sample)
+            if alerts:
+                self.alerts.append({'timestamp': ts, 'alerts': list(alerts)})
+            if actions:
+                self.actions.append({'timestamp': ts, 'actions': list(actions)})
+            self.latest = {'timestamp': ts, 'alerts': list(active_alerts), 'actions': list(actions)}
+
+    @staticmethod
+    def _after(entries, since, limit):
+        """Return up to `limit` newest entries with timestamp > since"""
+        selected = []
+        for entry in reversed(entries):
+            if since is not None and entry['timestamp'] <= since:
+                break
+            selected.append(entry)
+            if len(selected) >= limit:
+                break
+        selected.reverse()
+        return selected
+
+    def metrics_since(self, since=None, limit=500):
+        """Return resource metrics newer than `since` in columnar form"""
+        if self.metric_store is not None:
+            start = None if since is None else since + 1e-6
+            columns = [self.metric_store.query(name, start, limit=limit) for name in RESOURCE_METRICS]
+            count = min(min(len(column['timestamp']) for column in columns), limit)
+            result = {'timestamp': columns[0]['timestamp'][-count:] if count else []}
+            for name, column in zip(RESOURCE_METRICS, columns):
+                result[name] = column['value'][-count:] if count else []
+            return result
+
+        with self.lock:
+            samples = self._after(self.metrics, since, limit)
+        result = {'timestamp': [sample['timestamp'] for sample in samples]}
+        for name in RESOURCE_METRICS:
+            result[name] = [sample[name] for sample in samples]
+        return result
+
+    def alerts_since(self, since=None, limit=500):
+        with self.lock:
+            return {'events': self._after(self.alerts, since, limit), 'active': self.latest['alerts']}
+
+    def actions_since(self, since=None, limit=500):
+        with self.lock:
+            return {'events': self._after(self.actions, since, limit), 'latest': self.latest['actions']}
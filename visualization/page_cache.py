@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+import time
+from email.utils import formatdate
+from threading import Lock
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class RenderedPage:
+    """Immutable rendered response with precomputed compressed variants"""
+
+    def __init__(self, body, content_type='text/html; charset=utf-8', modified=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.modified = int(modified or time.time())
+        self.last_modified = formatdate(self.modified, usegmt=True)
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=6)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=5)
+
+    def select(self, accept_encoding):
+        """Return (encoding, body) for the smallest variant the client accepts"""
+        accepted = set()
+        for part in (accept_encoding or '').split(','):
+            coding, _, params = part.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(coding.strip().lower())
+
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding, self.variants[encoding]
+        return 'identity', self.variants['identity']
+
+class PageCache:
+    """In-memory pages swapped atomically by the renderer and read by the server.
+
+    A page can also be marked stale with a render function, which then runs
+    once on the next request for it instead of on every update.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.stale = {}
+        self.render_lock = Lock()
+        self.renders = 0
+
+    def publish(self, path, body, content_type='text/html; charset=utf-8'):
+        """Render variants for a new body and swap it in"""
+        page = RenderedPage(body, content_type)
+        current = self.pages.get(path)
+        if current is not None and current.etag == page.etag:
+            return current  # unchanged: keep the original Last-Modified
+        pages = dict(self.pages)
+        pages[path] = page
+        self.pages = pages
+        return page
+
+    def invalidate(self, path, render):
+        """Have the next get() of path publish render()'s body first"""
+        self.stale[path] = render
+
+    def get(self, path):
+        if path in self.stale:
+            with self.render_lock:
+                # Concurrent requests wait for one render instead of each doing it
+                render = self.stale.pop(path, None)
+                if render is not None:
+                    try:
+                        self.publish(path, render())
+                        self.renders += 1
+                    except Exception as e:
+                        print(f"Rendering {path} failed, serving the previous page: {e}")
+        return self.pages.get(path)
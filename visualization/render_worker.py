@@ -0,0 +1,87 @@
+import time
+from threading import Condition, Thread
+
+class RenderWorker:
+    """Run dashboard rendering on a background thread fed by a latest-value slot.
+
+    Submitting never blocks the monitoring loop: if the renderer is still busy
+    with an older cycle, the waiting cycle is replaced (coalesced) by the new
+    one, so only the freshest state is ever rendered.
+    """
+
+    def __init__(self, render):
+        self.render = render
+        self.condition = Condition()
+        self.pending = None
+        self.running = False
+        self.thread = None
+        self.submitted = 0
+        self.rendered = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.last_lag = 0.0
+        self.last_duration = 0.0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, *args):
+        """Queue a render of the given cycle, replacing any unrendered one"""
+        with self.condition:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = (time.monotonic(), args)
+            self.submitted += 1
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                submitted_at, args = self.pending
+                self.pending = None
+
+            started = time.monotonic()
+            try:
+                self.render(*args)
+            except Exception as e:
+                self.failures += 1
+                print(f"Dashboard render failed: {e}")
+            finished = time.monotonic()
+            self.rendered += 1
+            self.last_duration = finished - started
+            # Lag: time from the cycle being submitted to its page being published
+            self.last_lag = finished - submitted_at
+
+    def lag(self):
+        """Seconds the renderer is behind: last lag, or age of the waiting cycle"""
+        with self.condition:
+            if self.pending is not None:
+                return max(self.last_lag, time.monotonic() - self.pending[0])
+        return self.last_lag
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'rendered': self.rendered,
+            'coalesced': self.coalesced,
+            'failures': self.failures,
+            'lag_s': round(self.lag(), 3),
+            'last_render_s': round(self.last_duration, 3)
+        }
+
+    def stop(self, timeout=None):
+        """Render the last pending cycle, then stop the thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
@@ -0,0 +1,303 @@
+import json
+import time
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import BoundedSemaphore, Lock
+from urllib.parse import parse_qs, urlsplit
+from utils.records import json_default
+
+ROUTE_ALIASES = {'/dashboard.html': '/'}
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+class RequestStats:
+    """Thread-safe request counters and latency histogram for the server"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.by_status = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.active_connections = 0
+        self.total_connections = 0
+        self.rejected_connections = 0
+
+    def record(self, status, elapsed_ms):
+        with self.lock:
+            self.requests += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.by_status[status] = self.by_status.get(status, 0) + 1
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.buckets[i] += 1
+                    break
+            else:
+                self.buckets[-1] += 1
+
+    def connection_opened(self):
+        with self.lock:
+            self.active_connections += 1
+            self.total_connections += 1
+
+    def connection_closed(self):
+        with self.lock:
+            self.active_connections -= 1
+
+    def connection_rejected(self):
+        with self.lock:
+            self.rejected_connections += 1
+
+    def snapshot(self):
+        with self.lock:
+            labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ['inf']
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'requests': self.requests,
+                'avg_ms': round(self.total_ms / self.requests, 3) if self.requests else 0.0,
+                'max_ms': round(self.max_ms, 3),
+                'by_status': {str(code): count for code, count in self.by_status.items()},
+                'latency_histogram': dict(zip(labels, self.buckets)),
+                'active_connections': self.active_connections,
+                'total_connections': self.total_connections,
+                'rejected_connections': self.rejected_connections
+            }
+
+class DashboardHTTPServer(ThreadingHTTPServer):
+    """Thread-per-connection server with a cap on concurrent connections"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_connections=256):
+        self.connection_slots = BoundedSemaphore(max_connections)
+        self.stats = RequestStats()
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        if not self.connection_slots.acquire(blocking=False):
+            self.stats.connection_rejected()
+            try:
+                request.sendall(b'HTTP/1.1 503 Service Unavailable\r\n'
+                                b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.stats.connection_opened()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self.stats.connection_closed()
+            self.connection_slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.stats.connection_closed()
+            self.connection_slots.release()
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    """Serve published pages from a PageCache; nothing is read from disk"""
+
+    # HTTP/1.1 keeps connections alive; idle ones are closed after `timeout`
+    protocol_version = 'HTTP/1.1'
+    timeout = 15
+    page_cache = None
+    history = None
+    broadcaster = None
+    renderer = None
+    event_index = None
+    incidents = None
+    status_sources = None  # name -> callable returning a JSON-able dict
+    heartbeat_interval = 15
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+
+    def _not_modified(self, page):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return page.etag in tags or '*' in tags
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return page.modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_page(self, page, head_only=False):
+        if self._not_modified(page):
+            self.send_response(304)
+            self.send_header('ETag', page.etag)
+            self.send_header('Last-Modified', page.last_modified)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        encoding, body = page.select(self.headers.get('Accept-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-Type', page.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', page.etag)
+        self.send_header('Last-Modified', page.last_modified)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(memoryview(body))
+
+    def _send_error(self, code, message, head_only=False):
+        body = message.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _send_json(self, payload):
+        body = json.dumps(payload, default=json_default).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _timed_route(self, head_only=False):
+        started = time.perf_counter()
+        self.status_code = None
+        self.streamed = False
+        try:
+            self._route(head_only)
+        finally:
+            stats = getattr(self.server, 'stats', None)
+            # Long-lived event streams would swamp the latency histogram
+            if stats is not None and not self.streamed:
+                stats.record(self.status_code or 500, (time.perf_counter() - started) * 1000)
+
+    def _query_float(self, query, name):
+        values = query.get(name)
+        if not values:
+            return None
+        try:
+            return float(values[0])
+        except ValueError:
+            return None
+
+    def _route_api(self, path, query):
+        """Serve a JSON API route; return False if the path is not one"""
+        if path == '/api/server-stats' and hasattr(self.server, 'stats'):
+            stats = self.server.stats.snapshot()
+            if self.broadcaster is not None:
+                stats['stream_clients'] = self.broadcaster.client_count()
+            if self.renderer is not None:
+                stats['renderer'] = self.renderer.stats()
+            for name, source in (self.status_sources or {}).items():
+                stats[name] = source()
+            self._send_json(stats)
+            return True
+
+        if path == '/api/stream' and self.broadcaster is not None:
+            self._stream()
+            return True
+
+        if path == '/api/events' and self.event_index is not None:
+            self._query_events(query)
+            return True
+
+        if path == '/api/incidents' and self.incidents is not None:
+            payload = self.incidents.summary()
+            payload['now'] = time.time()
+            self._send_json(payload)
+            return True
+
+        handlers = {
+            '/api/metrics': 'metrics_since',
+            '/api/alerts': 'alerts_since',
+            '/api/actions': 'actions_since'
+        }
+        if path not in handlers or self.history is None:
+            return False
+
+        since = self._query_float(query, 'since')
+        limit = self._query_float(query, 'limit')
+        limit = 500 if limit is None else max(1, min(int(limit), 5000))
+        payload = getattr(self.history, handlers[path])(since, limit)
+        payload['now'] = time.time()
+        self._send_json(payload)
+        return True
+
+    def _query_events(self, query):
+        """Serve /api/events?type=&service=&since=&until=&limit= from the log index"""
+        limit = self._query_float(query, 'limit')
+        limit = 500 if limit is None else max(1, min(int(limit), 5000))
+        events = self.event_index.query(
+            since=self._query_float(query, 'since'),
+            until=self._query_float(query, 'until'),
+            event_type=(query.get('type') or [None])[0],
+            service=(query.get('service') or [None])[0],
+            limit=limit
+        )
+        self._send_json({'events': events, 'count': len(events), 'now': time.time()})
+
+    def _stream(self):
+        """Hold the connection open and push cycle events as Server-Sent Events"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        # No Content-Length: the stream ends when the connection closes
+        self.close_connection = True
+
+        self.streamed = True
+        subscription = self.broadcaster.subscribe()
+        try:
+            self.wfile.write(b'retry: 5000\n\n')
+            while not subscription.closed:
+                frame = subscription.get(timeout=self.heartbeat_interval)
+                self.wfile.write(frame if frame is not None else b': ping\n\n')
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            self.broadcaster.unsubscribe(subscription)
+
+    def _route(self, head_only=False):
+        url = urlsplit(self.path)
+        path = ROUTE_ALIASES.get(url.path, url.path)
+        if path.startswith('/api/'):
+            if head_only:
+                self._send_error(405, 'Method not allowed', head_only)
+            elif not self._route_api(path, parse_qs(url.query)):
+                self._send_error(404, 'Not found', head_only)
+            return
+        page = self.page_cache.get(path) if self.page_cache is not None else None
+        if page is None:
+            if path == '/':
+                self._send_error(503, 'Dashboard not rendered yet', head_only)
+            else:
+                self._send_error(404, 'Not found', head_only)
+            return
+        self._send_page(page, head_only)
+
+    def do_GET(self):
+        self._timed_route()
+
+    def do_HEAD(self):
+        self._timed_route(head_only=True)